@@ -1,4 +1,16 @@
 """API dependencies"""
-from app.api.dependencies.auth import get_current_user, get_current_active_user
+from app.api.dependencies.auth import (
+    AuthUser,
+    get_current_user,
+    get_current_active_user,
+    get_token_payload,
+    require_role,
+)
 
-__all__ = ["get_current_user", "get_current_active_user"]
+__all__ = [
+    "AuthUser",
+    "get_current_user",
+    "get_current_active_user",
+    "get_token_payload",
+    "require_role",
+]
@@ -1,22 +1,99 @@
 """
 Dependencies pour l'authentification JWT
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional
 
 from app.db.session import get_db
 from app.core.security import decode_token
+from app.core.jwt_cache import jwt_cache
+from app.core.token_blacklist import token_blacklist
 from app.services.user_service import get_user_by_id
-from app.models.user import User
+from app.models.user import User, Role
 
 
 # Security scheme pour JWT Bearer
-security = HTTPBearer()
+# auto_error=False: l'absence de token est traitée ici (401 pré-construit)
+security = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+# Exceptions pré-construites (requêtes non authentifiées fréquentes: bots, scans)
+# Toujours levées via `.with_traceback(None)` pour ne pas accumuler de frames
+_MISSING_TOKEN = _unauthorized("Not authenticated")
+_INVALID_TOKEN = _unauthorized("Invalid authentication token")
+_INVALID_PAYLOAD = _unauthorized("Invalid token payload")
+_USER_NOT_FOUND = _unauthorized("User not found")
+_INACTIVE_USER = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN,
+    detail="Inactive user"
+)
+
+
+async def get_token_payload(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> Dict[str, Any]:
+    """
+    Dependency qui décode le token JWT une seule fois par requête
+
+    Le payload est mémorisé dans `request.state` pour que les autres
+    dependencies de la même requête le réutilisent sans re-vérifier la
+    signature.
+
+    Args:
+        request: Requête courante
+        credentials: Token JWT depuis le header Authorization
+
+    Returns:
+        Payload du token
+
+    Raises:
+        HTTPException 401 si token absent, invalide ou révoqué
+    """
+    payload = getattr(request.state, "jwt_payload", None)
+    if payload is not None:
+        return payload
+
+    if credentials is None:
+        raise _MISSING_TOKEN.with_traceback(None)
+
+    token = credentials.credentials
+
+    # Token déjà validé récemment: pas de vérification de signature
+    cached = jwt_cache.get(token)
+    if cached is not None:
+        payload, user_data = cached
+        jti = payload.get("jti")
+        # Le token a pu être révoqué depuis sa mise en cache
+        if jti and await token_blacklist.is_blacklisted(jti):
+            jwt_cache.invalidate(token)
+            payload = None
+        else:
+            request.state.jwt_user_data = user_data
+    else:
+        payload = await decode_token(token)
+
+    if not payload:
+        raise _INVALID_TOKEN.with_traceback(None)
+
+    request.state.jwt_payload = payload
+    return payload
 
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    request: Request,
+    payload: Dict[str, Any] = Depends(get_token_payload),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """
@@ -30,6 +107,8 @@ async def get_current_user(
     ```
 
     Args:
+        request: Requête courante
+        payload: Payload du token (depuis get_token_payload)
         credentials: Token JWT depuis le header Authorization
         db: Session de base de données
 
@@ -39,39 +118,37 @@ async def get_current_user(
     Raises:
         HTTPException 401 si token invalide ou utilisateur non trouvé
     """
-    # Extraire le token
-    token = credentials.credentials
-
-    # Décoder le token
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # Utilisateur déjà en cache avec le token: pas de requête SQL
+    user_data = getattr(request.state, "jwt_user_data", None)
+    if user_data is not None:
+        return User(**user_data)
 
     # Extraire le user_id du payload
     user_id: str = payload.get("sub")
     if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _INVALID_PAYLOAD.with_traceback(None)
 
     # Récupérer l'utilisateur depuis la DB
     user = await get_user_by_id(db, user_id)
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _USER_NOT_FOUND.with_traceback(None)
+
+    jwt_cache.set(credentials.credentials, payload, _user_cache_data(user))
 
     return user
 
 
+def _user_cache_data(user: User) -> dict:
+    """Colonnes de l'utilisateur à mettre en cache (sans le hash du mot de passe)"""
+    data = {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key != "hashed_password"
+    }
+    data["role_level"] = user.role_level
+    return data
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -95,15 +172,52 @@ async def get_current_active_user(
         HTTPException 403 si utilisateur inactif
     """
     if not current_user.is_active:
-        raise HTTPException(
+        raise _INACTIVE_USER.with_traceback(None)
+
+    return current_user
+
+
+class AuthUser:
+    """
+    Dependency class: utilisateur connecté, actif et avec le rôle requis
+
+    Regroupe les vérifications de get_current_active_user et require_role
+    en une seule dependency (le niveau requis est calculé une fois, à la
+    construction).
+
+    Usage:
+    ```python
+    @router.post("/operators-only")
+    async def operators_only(user: User = Depends(AuthUser("operator"))):
+        return {"message": "Operator access granted"}
+    ```
+    """
+
+    def __init__(self, required_role: Optional[str] = None, active: bool = True):
+        """
+        Args:
+            required_role: Rôle minimum requis (admin, operator, viewer), None = aucun
+            active: Refuser les utilisateurs inactifs
+        """
+        self.required_role = required_role
+        self.required_level = Role.level_of(required_role)
+        self.active = active
+        self._forbidden = HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Inactive user"
+            detail=f"Insufficient permissions. Required role: {required_role}"
         )
 
-    return current_user
+    async def __call__(self, user: User = Depends(get_current_user)) -> User:
+        if self.active and not user.is_active:
+            raise _INACTIVE_USER.with_traceback(None)
 
+        if user.role_level < self.required_level:
+            raise self._forbidden.with_traceback(None)
 
-def require_role(required_role: str):
+        return user
+
+
+def require_role(required_role: str) -> AuthUser:
     """
     Dependency factory pour vérifier le rôle de l'utilisateur
 
@@ -118,25 +232,6 @@ def require_role(required_role: str):
         required_role: Rôle requis (admin, operator, viewer)
 
     Returns:
-        Dependency function
+        Dependency AuthUser (utilisateur actif avec au moins ce rôle)
     """
-    async def check_role(user: User = Depends(get_current_active_user)) -> User:
-        # Hiérarchie des rôles
-        role_hierarchy = {
-            "admin": 3,
-            "operator": 2,
-            "viewer": 1,
-        }
-
-        user_level = role_hierarchy.get(user.role, 0)
-        required_level = role_hierarchy.get(required_role, 0)
-
-        if user_level < required_level:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Insufficient permissions. Required role: {required_role}"
-            )
-
-        return user
-
-    return check_role
+    return AuthUser(required_role)
@@ -2,23 +2,25 @@
 Routes d'authentification
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, timezone
+import asyncio
+from typing import Dict, Any
 
 from app.schemas.auth import LoginRequest, LoginResponse, RefreshTokenRequest
 from app.schemas.user import UserResponse
 from app.db.session import get_db
-from app.services.user_service import authenticate_user, get_user_by_id
+from app.services.user_service import authenticate_user, get_user_by_id, update_last_login
 from app.services.session_service import create_session, revoke_session, delete_session
 from app.core.security import create_access_token, create_refresh_token, decode_token
 from app.core.config import settings
 from app.core.token_blacklist import token_blacklist
-from app.api.dependencies.auth import get_current_user
+from app.core.jwt_cache import jwt_cache
+from app.api.dependencies.auth import get_current_user, get_token_payload, security
 from app.models.user import User
 
 router = APIRouter()
-security = HTTPBearer()
 
 
 @router.post("/login", response_model=LoginResponse)
@@ -67,6 +69,9 @@ async def login(
     user_agent = request.headers.get("user-agent")
     ip_address = request.client.host if request.client else None
 
+    # Mettre à jour last_login (UPDATE direct, même transaction que la session)
+    await update_last_login(db, user)
+
     # Créer la session en base de données
     await create_session(
         db=db,
@@ -76,11 +81,11 @@ async def login(
         refresh_token=refresh_token,
         expires_at=access_expires_at,
         user_agent=user_agent,
-        ip_address=ip_address
+        ip_address=ip_address,
+        commit=False
     )
 
-    # Mettre à jour last_login
-    user.last_login = datetime.utcnow()
+    # Un seul commit pour last_login + session
     await db.commit()
 
     # Retourner le token et les infos utilisateur
@@ -88,7 +93,7 @@ async def login(
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer",
-        user=user.to_dict()
+        user=UserResponse.model_validate(user)
     )
 
 
@@ -105,7 +110,7 @@ async def refresh_token(
     Returns un nouveau access_token
     """
     # Décoder le refresh token
-    payload = decode_token(request.refresh_token)
+    payload = await decode_token(request.refresh_token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -140,12 +145,12 @@ async def refresh_token(
         )
 
     # Créer un nouveau access token
-    access_token = create_access_token(
+    access_token, _, _ = create_access_token(
         data={"sub": user.id, "username": user.username, "role": user.role}
     )
 
     # Créer un nouveau refresh token
-    new_refresh_token = create_refresh_token(
+    new_refresh_token, _, _ = create_refresh_token(
         data={"sub": user.id}
     )
 
@@ -153,13 +158,14 @@ async def refresh_token(
         access_token=access_token,
         refresh_token=new_refresh_token,
         token_type="bearer",
-        user=user.to_dict()
+        user=UserResponse.model_validate(user)
     )
 
 
 @router.post("/logout")
 async def logout(
     token: HTTPAuthorizationCredentials = Depends(security),
+    payload: Dict[str, Any] = Depends(get_token_payload),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -171,15 +177,6 @@ async def logout(
 
     Nécessite un token JWT valide dans le header Authorization
     """
-    # Décoder le token pour extraire le JTI
-    payload = decode_token(token.credentials, check_blacklist=False)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
     jti = payload.get("jti")
     exp = payload.get("exp")
 
@@ -191,13 +188,16 @@ async def logout(
         )
 
     # Convertir timestamp exp en datetime
-    expires_at = datetime.fromtimestamp(exp) if exp else datetime.utcnow()
+    expires_at = datetime.fromtimestamp(exp, tz=timezone.utc) if exp else datetime.now(timezone.utc)
 
-    # Blacklister le token
-    token_blacklist.blacklist_token(jti, expires_at)
+    jwt_cache.invalidate(token.credentials)
 
-    # Révoquer la session en base de données
-    await revoke_session(db, jti)
+    # Blacklister le token et révoquer la session en base en parallèle
+    # (blacklist et base de données sont deux ressources indépendantes)
+    await asyncio.gather(
+        token_blacklist.blacklist_token(jti, expires_at),
+        revoke_session(db, jti),
+    )
 
     return {
         "message": "Logout successful",
@@ -212,40 +212,17 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
     Nécessite un token JWT valide dans le header Authorization
     """
-    return UserResponse(**current_user.to_dict())
+    return current_user
 
 
 @router.get("/verify")
-async def verify_token_endpoint(
-    token: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-):
+async def verify_token_endpoint(current_user: User = Depends(get_current_user)):
     """
     Vérifier la validité d'un token JWT
 
     Returns l'utilisateur si le token est valide
     """
-    # Décoder le token
-    payload = decode_token(token.credentials)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    # Récupérer le user_id
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    # Récupérer l'utilisateur
-    user = await get_user_by_id(db, user_id)
-    if not user or not user.is_active:
+    if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
@@ -254,5 +231,5 @@ async def verify_token_endpoint(
 
     return {
         "valid": True,
-        "user": user.to_dict()
+        "user": UserResponse.model_validate(current_user)
     }
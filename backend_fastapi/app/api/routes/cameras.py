@@ -3,7 +3,9 @@ Routes pour la gestion des caméras
 """
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
 from typing import List
+from loguru import logger
 from datetime import datetime
 
 from app.schemas.camera import (
@@ -15,10 +17,12 @@ from app.schemas.camera import (
     CameraDiscoveryResult,
     CameraStatus,
 )
+from app.core.config import settings
 from app.db.session import get_db
 from app.services import camera_service
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user, require_role
 from app.models.user import User
+from app.models.camera import Camera
 from app.core.camera_stream_manager import camera_stream_manager
 
 router = APIRouter()
@@ -41,14 +45,32 @@ async def get_cameras(
 
     Returns la liste des caméras avec leurs statuts
     """
-    cameras = await camera_service.get_cameras(
-        db=db,
-        skip=skip,
-        limit=limit,
-        enabled_only=enabled_only
+    cache_key = ("list", skip, limit, enabled_only)
+    cached = camera_service.camera_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        cameras = await camera_service.get_cameras(
+            db=db,
+            skip=skip,
+            limit=limit,
+            enabled_only=enabled_only
+        )
+    except SQLAlchemyError:
+        # Stale-if-error: servir la dernière liste connue si la base est indisponible
+        stale = camera_service.camera_cache.get_stale(cache_key)
+        if stale is None:
+            raise
+        logger.exception("Camera list query failed, serving stale cache")
+        return stale
+
+    response = [CameraResponse.model_validate(camera) for camera in cameras]
+    camera_service.camera_cache.set(
+        cache_key, response, ttl=settings.CAMERA_LIST_CACHE_TTL_SECONDS
     )
 
-    return cameras
+    return response
 
 
 @router.get("/{camera_id}", response_model=CameraResponse)
@@ -62,7 +84,20 @@ async def get_camera(
 
     - **camera_id**: Identifiant de la caméra
     """
-    camera = await camera_service.get_camera_by_id(db, camera_id)
+    cache_key = ("detail", camera_id)
+    cached = camera_service.camera_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        camera = await camera_service.get_camera_by_id(db, camera_id)
+    except SQLAlchemyError:
+        # Stale-if-error: servir le dernier détail connu si la base est indisponible
+        stale = camera_service.camera_cache.get_stale(cache_key)
+        if stale is None:
+            raise
+        logger.exception(f"Camera {camera_id} query failed, serving stale cache")
+        return stale
 
     if not camera:
         raise HTTPException(
@@ -70,7 +105,12 @@ async def get_camera(
             detail=f"Camera {camera_id} not found"
         )
 
-    return camera
+    response = CameraResponse.model_validate(camera)
+    camera_service.camera_cache.set(
+        cache_key, response, ttl=settings.CAMERA_DETAIL_CACHE_TTL_SECONDS
+    )
+
+    return response
 
 
 @router.post("", response_model=CameraResponse, status_code=status.HTTP_201_CREATED)
@@ -80,7 +120,7 @@ async def create_camera(
     password: str = None,
     camera_type: str = "generic",
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role("admin"))
 ):
     """
     Créer une nouvelle caméra
@@ -95,13 +135,6 @@ async def create_camera(
 
     Requires admin role
     """
-    # Vérifier les permissions
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can create cameras"
-        )
-
     # Vérifier si une caméra avec le même nom existe déjà
     existing = await camera_service.get_camera_by_name(db, camera.name)
     if existing:
@@ -128,7 +161,7 @@ async def update_camera(
     username: str = None,
     password: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role("operator"))
 ):
     """
     Mettre à jour une caméra existante
@@ -139,13 +172,6 @@ async def update_camera(
 
     Requires admin or operator role
     """
-    # Vérifier les permissions
-    if current_user.role not in ["admin", "operator"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins and operators can update cameras"
-        )
-
     updated_camera = await camera_service.update_camera(
         db=db,
         camera_id=camera_id,
@@ -167,7 +193,7 @@ async def update_camera(
 async def delete_camera(
     camera_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role("admin"))
 ):
     """
     Supprimer une caméra
@@ -176,13 +202,6 @@ async def delete_camera(
 
     Requires admin role
     """
-    # Vérifier les permissions
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can delete cameras"
-        )
-
     deleted = await camera_service.delete_camera(db, camera_id)
 
     if not deleted:
@@ -198,7 +217,7 @@ async def delete_camera(
 async def start_camera(
     camera_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role("operator"))
 ):
     """
     Démarrer le streaming d'une caméra
@@ -207,20 +226,6 @@ async def start_camera(
 
     Requires admin or operator role
     """
-    # Vérifier les permissions
-    if current_user.role not in ["admin", "operator"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins and operators can start cameras"
-        )
-
-    camera = await camera_service.get_camera_by_id(db, camera_id)
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Camera {camera_id} not found"
-        )
-
     # Démarrer le stream via le stream manager
     success = await camera_stream_manager.start_camera(
         db=db,
@@ -228,13 +233,24 @@ async def start_camera(
     )
 
     if not success:
+        # Distinguer caméra inexistante et échec du stream
+        if not await camera_service.get_camera_by_id(db, camera_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Camera {camera_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to start camera {camera_id}"
         )
 
-    # Récupérer la caméra mise à jour
-    updated_camera = await camera_service.get_camera_by_id(db, camera_id)
+    # État final retourné par UPDATE ... RETURNING, déjà dans l'identity map
+    updated_camera = await db.get(Camera, camera_id)
+    if not updated_camera:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Camera {camera_id} not found"
+        )
 
     return {
         "message": f"Camera {camera_id} started successfully",
@@ -247,7 +263,7 @@ async def start_camera(
 async def stop_camera(
     camera_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role("operator"))
 ):
     """
     Arrêter le streaming d'une caméra
@@ -256,20 +272,6 @@ async def stop_camera(
 
     Requires admin or operator role
     """
-    # Vérifier les permissions
-    if current_user.role not in ["admin", "operator"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins and operators can stop cameras"
-        )
-
-    camera = await camera_service.get_camera_by_id(db, camera_id)
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Camera {camera_id} not found"
-        )
-
     # Arrêter le stream via le stream manager
     success = await camera_stream_manager.stop_camera(
         db=db,
@@ -277,13 +279,24 @@ async def stop_camera(
     )
 
     if not success:
+        # Distinguer caméra inexistante et échec du stream
+        if not await camera_service.get_camera_by_id(db, camera_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Camera {camera_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to stop camera {camera_id}"
         )
 
-    # Récupérer la caméra mise à jour
-    updated_camera = await camera_service.get_camera_by_id(db, camera_id)
+    # État final retourné par UPDATE ... RETURNING, déjà dans l'identity map
+    updated_camera = await db.get(Camera, camera_id)
+    if not updated_camera:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Camera {camera_id} not found"
+        )
 
     return {
         "message": f"Camera {camera_id} stopped successfully",
@@ -328,7 +341,7 @@ async def get_camera_stats(
 
 @router.post("/discover", response_model=List[CameraDiscoveryResult])
 async def discover_cameras(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role("admin"))
 ):
     """
     Découvrir automatiquement les caméras sur le réseau
@@ -339,13 +352,6 @@ async def discover_cameras(
 
     Requires admin role
     """
-    # Vérifier les permissions
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can discover cameras"
-        )
-
     # TODO: Implémenter la découverte réseau (ONVIF, mDNS)
     raise HTTPException(
         status_code=status.HTTP_501_NOT_IMPLEMENTED,
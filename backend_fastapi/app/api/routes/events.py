@@ -1,10 +1,8 @@
 """
 Routes pour la gestion des événements
 """
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from typing import Optional, List
-from datetime import datetime, timedelta
-import random
 
 from app.schemas.event import (
     EventCreate,
@@ -16,56 +14,22 @@ from app.schemas.event import (
     EventType,
     EventSeverity,
 )
+from app.services import event_service
 
 router = APIRouter()
 
-# Données mockées pour le développement
-def generate_mock_events(count: int = 20) -> List[dict]:
-    """Génère des événements mockés pour le test"""
-    event_types = ["person", "vehicle", "intrusion", "unknown"]
-    severities = ["low", "medium", "high", "critical"]
-    camera_ids = ["imou_01", "camera_1", "camera_2"]
-
-    events = []
-    base_time = datetime.utcnow()
-
-    for i in range(count):
-        event_type = random.choice(event_types)
-        severity = random.choice(severities)
-        camera_id = random.choice(camera_ids)
-
-        # Timestamp décroissant (plus récent en premier)
-        timestamp = base_time - timedelta(minutes=i * 15)
-
-        events.append({
-            "id": f"event_{i+1}",
-            "camera_id": camera_id,
-            "event_type": event_type,
-            "severity": severity,
-            "description": f"Événement {event_type} détecté",
-            "timestamp": timestamp.isoformat(),
-            "acknowledged": i > 15,  # Les 5 premiers non acquittés
-            "acknowledged_by": "user_1" if i > 15 else None,
-            "acknowledged_at": (timestamp + timedelta(minutes=5)).isoformat() if i > 15 else None,
-            "metadata": {
-                "confidence": round(random.uniform(0.7, 0.99), 2),
-                "object_count": random.randint(1, 3),
-            },
-        })
-
-    return events
-
-MOCK_EVENTS = generate_mock_events(20)
-
 
 @router.get("", response_model=List[EventResponse])
 async def get_events(
+    response: Response,
     camera_id: Optional[str] = Query(None, description="Filtrer par caméra"),
-    event_type: Optional[str] = Query(None, description="Filtrer par type"),
-    severity: Optional[str] = Query(None, description="Filtrer par sévérité"),
+    event_type: Optional[EventType] = Query(None, description="Filtrer par type"),
+    severity: Optional[EventSeverity] = Query(None, description="Filtrer par sévérité"),
     acknowledged: Optional[bool] = Query(None, description="Filtrer par statut"),
     page: int = Query(1, ge=1, description="Numéro de page"),
     page_size: int = Query(50, ge=1, le=100, description="Taille de page"),
+    before: Optional[str] = Query(None, description="Curseur de pagination (header X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Nombre d'événements (remplace page_size)"),
 ):
     """
     Récupérer la liste des événements avec filtres et pagination
@@ -77,28 +41,42 @@ async def get_events(
     - **acknowledged**: Filtrer par statut d'acquittement
     - **page**: Numéro de page (défaut: 1)
     - **page_size**: Nombre d'événements par page (max: 100)
+    - **before** / **limit**: Pagination par curseur (recommandée), le curseur
+      de la page suivante est renvoyé dans le header `X-Next-Cursor`
     """
-    # Filtrer les événements
-    filtered_events = MOCK_EVENTS.copy()
-
-    if camera_id:
-        filtered_events = [e for e in filtered_events if e["camera_id"] == camera_id]
-
-    if event_type:
-        filtered_events = [e for e in filtered_events if e["event_type"] == event_type]
-
-    if severity:
-        filtered_events = [e for e in filtered_events if e["severity"] == severity]
+    filters = EventFilters(
+        camera_id=camera_id,
+        event_type=event_type,
+        severity=severity,
+        acknowledged=acknowledged,
+        page=page,
+        page_size=page_size,
+    )
 
-    if acknowledged is not None:
-        filtered_events = [e for e in filtered_events if e["acknowledged"] == acknowledged]
+    cursor = None
+    if before:
+        try:
+            cursor = event_service.decode_cursor(before)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+
+    limit = limit or page_size
+
+    # Filtres et pagination délégués au stockage (seule la page est chargée)
+    events = await event_service.list_events(
+        filters,
+        limit=limit,
+        offset=(page - 1) * page_size,
+        before=cursor,
+    )
 
-    # Pagination
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    paginated_events = filtered_events[start_idx:end_idx]
+    if len(events) == limit:
+        response.headers["X-Next-Cursor"] = event_service.encode_cursor(events[-1])
 
-    return paginated_events
+    return events
 
 
 @router.get("/stats", response_model=EventStatsResponse)
@@ -3,10 +3,11 @@ Routes de gestion des sessions utilisateur
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Any, Dict, List
+import asyncio
 
 from app.db.session import get_db
-from app.api.dependencies.auth import get_current_user
+from app.api.dependencies.auth import get_current_user, get_token_payload
 from app.models.user import User
 from app.services import session_service
 from app.core.token_blacklist import token_blacklist
@@ -71,7 +72,7 @@ async def revoke_session_by_id(
 
     # Blacklister le token si la session est encore active
     if session.is_active:
-        token_blacklist.blacklist_token(session.token_jti, session.expires_at)
+        await token_blacklist.blacklist_token(session.token_jti, session.expires_at)
 
     # Révoquer la session
     revoked = await session_service.revoke_session(db, session_id)
@@ -91,6 +92,7 @@ async def revoke_session_by_id(
 @router.delete("/sessions")
 async def revoke_all_sessions(
     current_user: User = Depends(get_current_user),
+    payload: Dict[str, Any] = Depends(get_token_payload),
     db: AsyncSession = Depends(get_db),
     except_current: bool = True
 ):
@@ -108,23 +110,21 @@ async def revoke_all_sessions(
         active_only=True
     )
 
-    # Blacklister tous les tokens
-    current_jti = None  # TODO: extraire du token actuel si except_current
-    revoked_count = 0
-
-    for session in sessions:
-        if except_current and session.token_jti == current_jti:
-            continue
-
-        # Blacklister le token
-        token_blacklist.blacklist_token(session.token_jti, session.expires_at)
-        revoked_count += 1
-
-    # Révoquer toutes les sessions sauf la courante
-    revoked = await session_service.revoke_all_user_sessions(
-        db=db,
-        user_id=current_user.id,
-        except_jti=current_jti if except_current else None
+    current_jti = payload.get("jti") if except_current else None
+    to_blacklist = [
+        (session.token_jti, session.expires_at)
+        for session in sessions
+        if session.token_jti != current_jti
+    ]
+
+    # Blacklist (un seul appel groupé) et révocation en base en parallèle
+    revoked_count, revoked = await asyncio.gather(
+        token_blacklist.blacklist_many(to_blacklist),
+        session_service.revoke_all_user_sessions(
+            db=db,
+            user_id=current_user.id,
+            except_jti=current_jti
+        )
     )
 
     return {
@@ -144,18 +144,14 @@ async def get_session_stats(
 
     Returns le nombre de sessions actives, totales, etc.
     """
-    all_sessions = await session_service.get_user_sessions(
+    active_sessions, total_sessions = await session_service.get_user_session_counts(
         db=db,
-        user_id=current_user.id,
-        active_only=False
+        user_id=current_user.id
     )
 
-    active_sessions = [s for s in all_sessions if s.is_active]
-    revoked_sessions = [s for s in all_sessions if not s.is_active]
-
     return {
-        "total_sessions": len(all_sessions),
-        "active_sessions": len(active_sessions),
-        "revoked_sessions": len(revoked_sessions),
-        "blacklist_stats": token_blacklist.get_stats()
+        "total_sessions": total_sessions,
+        "active_sessions": active_sessions,
+        "revoked_sessions": total_sessions - active_sessions,
+        "blacklist_stats": await token_blacklist.get_stats()
     }
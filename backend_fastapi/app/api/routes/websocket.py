@@ -2,60 +2,248 @@
 Routes WebSocket pour communication temps réel
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Set
-import json
+from typing import Dict, Iterable, Optional, Set
 import asyncio
+from datetime import datetime
+from time import monotonic
+import numpy as np
+import orjson
+from loguru import logger
+
+try:
+    import msgpack
+except ImportError:  # optionnel: sous-protocole "msgpack" indisponible
+    msgpack = None
 
 router = APIRouter()
 
+# Sous-protocole WebSocket binaire (messages MessagePack dans les deux sens)
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+def encode_message(message: dict) -> str:
+    """
+    Sérialiser un message WebSocket (orjson: datetime et numpy supportés)
+
+    Les messages restent des frames texte: les clients font JSON.parse sur
+    `event.data`, une frame binaire leur arriverait en Blob.
+
+    Args:
+        message: Message à envoyer
+
+    Returns:
+        Texte JSON prêt pour send_text
+    """
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _msgpack_default(value):
+    """Types non natifs pour MessagePack (mêmes conversions qu'orjson)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type not serializable: {type(value).__name__}")
+
+
+def encode_message_msgpack(message: dict) -> bytes:
+    """
+    Sérialiser un message pour un client du sous-protocole msgpack
+
+    Args:
+        message: Message à envoyer
+
+    Returns:
+        Octets MessagePack prêts pour send_bytes
+    """
+    return msgpack.packb(message, default=_msgpack_default)
+
+
+# Erreurs de décodage d'un message client (JSON ou MessagePack)
+_DECODE_ERRORS = (ValueError,) if msgpack is None else (ValueError, msgpack.UnpackException)
+
+
+def _decode_message(data, binary: bool) -> dict:
+    """Décoder un message client (MessagePack si binary, JSON sinon)"""
+    message = msgpack.unpackb(data, raw=False) if binary else orjson.loads(data)
+    if not isinstance(message, dict):
+        raise ValueError("Message must be an object")
+    return message
+
 
 class ConnectionManager:
     """
     Gestionnaire de connexions WebSocket
     Gère les connexions multiples et le broadcast de messages
+
+    Chaque client possède une petite file d'envoi vidée par une tâche
+    dédiée: un client lent perd les messages les plus anciens au lieu de
+    ralentir le broadcast (et donc le pipeline de capture).
+
+    Les messages sont publiés sur des canaux ("events", "cameras", "system",
+    "frames:{camera_id}") et ne sont envoyés qu'aux abonnés. Un nouveau
+    client est abonné aux canaux par défaut; les frames, volumineuses et
+    fréquentes, doivent être demandées explicitement (message "subscribe").
     """
 
-    def __init__(self):
-        # Ensemble des connexions actives
-        self.active_connections: Set[WebSocket] = set()
+    # Taille de la file par client (les frames intermédiaires sont écartées)
+    QUEUE_SIZE = 2
+
+    # Canaux auxquels tout nouveau client est abonné
+    DEFAULT_CHANNELS = frozenset({"events", "cameras", "system"})
 
-    async def connect(self, websocket: WebSocket):
-        """Accepter une nouvelle connexion"""
-        await websocket.accept()
-        self.active_connections.add(websocket)
-        print(f"OK WebSocket connected. Total connections: {len(self.active_connections)}")
+    def __init__(self):
+        # Connexions actives -> file d'envoi
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}
+        # Connexions actives -> tâche d'écriture
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
+        # Connexions en échec d'envoi, retirées en lot au prochain broadcast
+        self._dead: Set[WebSocket] = set()
+        # Canal -> abonnés, et connexion -> canaux (pour le nettoyage)
+        self.channels: Dict[str, Set[WebSocket]] = {}
+        self._subscriptions: Dict[WebSocket, Set[str]] = {}
+        # Connexions ayant négocié le sous-protocole msgpack
+        self._binary: Set[WebSocket] = set()
+
+    async def connect(self, websocket: WebSocket, subprotocol: Optional[str] = None):
+        """Accepter une nouvelle connexion (sous-protocole éventuellement négocié)"""
+        await websocket.accept(subprotocol=subprotocol)
+        if subprotocol == MSGPACK_SUBPROTOCOL:
+            self._binary.add(websocket)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.active_connections[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
+        self.subscribe(websocket, self.DEFAULT_CHANNELS)
+        logger.info("WebSocket connected. Total connections: {}", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
         """Déconnecter un client"""
-        self.active_connections.discard(websocket)
-        print(f"❌ WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        self._dead.discard(websocket)
+        if self.active_connections.pop(websocket, None) is None:
+            return
+
+        self._unsubscribe_all(websocket)
+        self._binary.discard(websocket)
+
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        logger.info("WebSocket disconnected. Total connections: {}", len(self.active_connections))
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Tâche d'écriture: envoie les messages de la file du client"""
+        try:
+            while True:
+                payload = await queue.get()
+                await self._send(websocket, payload)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug("Error sending to WebSocket client: {}", e)
+            self._dead.add(websocket)
+
+    def _drop_dead_connections(self):
+        """Retirer en une fois les connexions dont l'envoi a échoué"""
+        dead, self._dead = self._dead, set()
+        for websocket in dead:
+            # Tâche d'écriture déjà terminée (c'est elle qui a signalé l'échec)
+            self.active_connections.pop(websocket, None)
+            self._writers.pop(websocket, None)
+            self._unsubscribe_all(websocket)
+            self._binary.discard(websocket)
+        logger.info("Dropped {} dead WebSocket connections", len(dead))
+
+    def subscribe(self, websocket: WebSocket, channels: Iterable[str]):
+        """Abonner un client à des canaux"""
+        subscriptions = self._subscriptions.setdefault(websocket, set())
+        for channel in channels:
+            self.channels.setdefault(channel, set()).add(websocket)
+            subscriptions.add(channel)
+
+    def unsubscribe(self, websocket: WebSocket, channels: Iterable[str]):
+        """Désabonner un client de canaux"""
+        subscriptions = self._subscriptions.get(websocket, set())
+        for channel in channels:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.channels[channel]
+            subscriptions.discard(channel)
+
+    def _unsubscribe_all(self, websocket: WebSocket):
+        self.unsubscribe(websocket, list(self._subscriptions.get(websocket, ())))
+        self._subscriptions.pop(websocket, None)
+
+    def _encode_for(self, websocket: WebSocket, message: dict):
+        """Sérialiser un message selon le protocole du client"""
+        if websocket in self._binary:
+            return encode_message_msgpack(message)
+        return encode_message(message)
+
+    @staticmethod
+    async def _send(websocket: WebSocket, payload):
+        """Envoyer une frame binaire (msgpack) ou texte (JSON)"""
+        if isinstance(payload, bytes):
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_text(payload)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Envoyer un message à un client spécifique"""
-        await websocket.send_json(message)
+        await self._send(websocket, self._encode_for(websocket, message))
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, message: dict, channel: Optional[str] = None):
         """
-        Broadcaster un message à tous les clients connectés
-        Gère automatiquement les connexions fermées
+        Broadcaster un message aux abonnés d'un canal
+
+        Le message est sérialisé une seule fois puis déposé dans la file de
+        chaque client (sans attendre l'envoi). File pleine: le plus ancien
+        message en attente est abandonné.
+
+        Args:
+            message: Message à envoyer
+            channel: Canal cible (None = tous les clients connectés)
         """
-        disconnected = set()
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error sending to client: {e}")
-                disconnected.add(connection)
+        if self._dead:
+            self._drop_dead_connections()
+
+        if channel is None:
+            recipients = self.active_connections.keys()
+        else:
+            recipients = self.channels.get(channel)
 
-        # Nettoyer les connexions mortes
-        for connection in disconnected:
-            self.disconnect(connection)
+        if not recipients:
+            return
+
+        # Sérialiser une seule fois par protocole (JSON / msgpack)
+        payloads = {}
+
+        for websocket in recipients:
+            binary = websocket in self._binary
+            payload = payloads.get(binary)
+            if payload is None:
+                payload = payloads[binary] = self._encode_for(websocket, message)
+
+            queue = self.active_connections[websocket]
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
 
 
 # Instance globale du gestionnaire
 manager = ConnectionManager()
 
 
+def _channel_names(channels) -> list:
+    """Noms de canaux valides d'un message subscribe/unsubscribe"""
+    if not isinstance(channels, list):
+        return []
+    return [channel for channel in channels if isinstance(channel, str)]
+
+
 @router.websocket("")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -74,8 +262,18 @@ async def websocket_endpoint(websocket: WebSocket):
         "data": { ... }
     }
     ```
+
+    Canaux (abonnement par défaut: events, cameras, system):
+    ```json
+    {"type": "subscribe", "channels": ["frames:camera_1"]}
+    ```
+
+    Un client qui demande le sous-protocole `msgpack` échange les mêmes
+    messages encodés en MessagePack (frames binaires) au lieu de JSON.
     """
-    await manager.connect(websocket)
+    # Sous-protocole msgpack si demandé par le client (et msgpack installé)
+    binary = msgpack is not None and MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await manager.connect(websocket, MSGPACK_SUBPROTOCOL if binary else None)
 
     try:
         # Envoyer un message de bienvenue
@@ -83,91 +281,109 @@ async def websocket_endpoint(websocket: WebSocket):
             {
                 "type": "connected",
                 "message": "Connected to Sentinel IA WebSocket",
-                "timestamp": asyncio.get_event_loop().time(),
+                "timestamp": monotonic(),
             },
             websocket
         )
 
         # Boucle de réception des messages
         while True:
-            # Recevoir les messages du client
-            data = await websocket.receive_text()
+            # Recevoir les messages du client (frame texte ou binaire)
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                break
+
+            data = received.get("bytes") if binary else received.get("text")
+            if data is None:
+                # Frame du mauvais type pour le protocole négocié
+                await manager.send_personal_message(
+                    {
+                        "type": "error",
+                        "message": "Expected binary frame" if binary else "Expected text frame"
+                    },
+                    websocket
+                )
+                continue
 
             try:
-                message = json.loads(data)
-                message_type = message.get("type")
-
-                # Traiter les différents types de messages
-                if message_type == "ping":
-                    # Répondre au heartbeat
-                    await manager.send_personal_message(
-                        {"type": "pong", "timestamp": asyncio.get_event_loop().time()},
-                        websocket
-                    )
-
-                elif message_type == "subscribe":
-                    # TODO: Implémenter la souscription à des événements spécifiques
-                    channels = message.get("channels", [])
-                    await manager.send_personal_message(
-                        {"type": "subscribed", "channels": channels},
-                        websocket
-                    )
-
-                elif message_type == "unsubscribe":
-                    # TODO: Implémenter la désouscription
-                    channels = message.get("channels", [])
-                    await manager.send_personal_message(
-                        {"type": "unsubscribed", "channels": channels},
-                        websocket
-                    )
-
-                else:
-                    # Message non reconnu
-                    await manager.send_personal_message(
-                        {"type": "error", "message": f"Unknown message type: {message_type}"},
-                        websocket
-                    )
-
-            except json.JSONDecodeError:
+                message = _decode_message(data, binary)
+            except _DECODE_ERRORS:
+                await manager.send_personal_message(
+                    {"type": "error", "message": "Invalid MessagePack" if binary else "Invalid JSON"},
+                    websocket
+                )
+                continue
+
+            message_type = message.get("type")
+
+            # Traiter les différents types de messages
+            if message_type == "ping":
+                # Répondre au heartbeat
+                await manager.send_personal_message(
+                    {"type": "pong", "timestamp": monotonic()},
+                    websocket
+                )
+
+            elif message_type == "subscribe":
+                channels = _channel_names(message.get("channels"))
+                manager.subscribe(websocket, channels)
+                await manager.send_personal_message(
+                    {"type": "subscribed", "channels": channels},
+                    websocket
+                )
+
+            elif message_type == "unsubscribe":
+                channels = _channel_names(message.get("channels"))
+                manager.unsubscribe(websocket, channels)
+                await manager.send_personal_message(
+                    {"type": "unsubscribed", "channels": channels},
+                    websocket
+                )
+
+            else:
+                # Message non reconnu
                 await manager.send_personal_message(
-                    {"type": "error", "message": "Invalid JSON"},
+                    {"type": "error", "message": f"Unknown message type: {message_type}"},
                     websocket
                 )
 
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Toujours libérer abonnements et tâche d'écriture (y compris sur erreur)
         manager.disconnect(websocket)
 
 
 # Fonctions utilitaires pour broadcaster depuis d'autres modules
 async def broadcast_new_event(event: dict):
-    """Broadcaster un nouvel événement à tous les clients"""
+    """Broadcaster un nouvel événement (canal "events")"""
     await manager.broadcast({
         "type": "new_event",
         "data": event
-    })
+    }, channel="events")
 
 
 async def broadcast_frame_update(camera_id: str, frame_data: str):
-    """Broadcaster une mise à jour de frame"""
+    """Broadcaster une mise à jour de frame (canal "frames:{camera_id}")"""
     await manager.broadcast({
         "type": "frame_update",
         "camera_id": camera_id,
         "data": frame_data
-    })
+    }, channel=f"frames:{camera_id}")
 
 
 async def broadcast_camera_status(camera_id: str, status: str):
-    """Broadcaster un changement de statut caméra"""
+    """Broadcaster un changement de statut caméra (canal "cameras")"""
     await manager.broadcast({
         "type": "camera_status",
         "camera_id": camera_id,
         "status": status
-    })
+    }, channel="cameras")
 
 
 async def broadcast_system_alert(alert: dict):
-    """Broadcaster une alerte système"""
+    """Broadcaster une alerte système (canal "system")"""
     await manager.broadcast({
         "type": "system_alert",
         "data": alert
-    })
+    }, channel="system")
@@ -0,0 +1,153 @@
+"""
+Filtre d'appartenance approximatif pour les JTI révoqués
+
+Sert de raccourci devant la blacklist: la grande majorité des tokens
+ne sont pas révoqués, un "absent" certain évite l'aller-retour vers le
+stockage de référence (Redis). Un "peut-être présent" renvoie toujours
+vers ce stockage, il n'y a donc jamais de faux négatif.
+"""
+import hashlib
+import math
+import time
+from typing import Set
+
+
+class BloomTokenFilter:
+    """
+    Ensemble de JTI en deux phases
+
+    Tant que le nombre d'éléments reste sous `set_max_size`, un set Python
+    donne une réponse exacte. Au-delà, le contenu est converti en filtre de
+    Bloom dimensionné pour `capacity` éléments au taux de faux positifs
+    `error_rate` (≈1.2 Mo pour 1e6 éléments à 1%).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.01,
+        set_max_size: int = 10_000
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.set_max_size = set_max_size
+
+        # Dimensionnement classique: m = -n ln(p) / ln(2)^2, k = m/n ln(2)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+
+        self._set: Set[str] = set()
+        self._bits: bytearray = bytearray()
+        self._count = 0
+
+    @property
+    def is_bloom(self) -> bool:
+        """True si le filtre a été converti en Bloom (réponses approximatives)"""
+        return bool(self._bits)
+
+    def _positions(self, jti: str):
+        # Double hachage (Kirsch-Mitzenmacher) à partir d'un seul BLAKE2b
+        digest = hashlib.blake2b(jti.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def _add_to_bloom(self, jti: str) -> None:
+        for position in self._positions(jti):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def add(self, jti: str) -> None:
+        """Ajouter un JTI"""
+        if self._bits:
+            self._add_to_bloom(jti)
+            self._count += 1
+            return
+
+        self._set.add(jti)
+        self._count = len(self._set)
+
+        if len(self._set) > self.set_max_size:
+            # Conversion en Bloom: mémoire bornée quel que soit le volume
+            self._bits = bytearray((self.num_bits + 7) // 8)
+            for item in self._set:
+                self._add_to_bloom(item)
+            self._set.clear()
+
+    def might_contain(self, jti: str) -> bool:
+        """
+        Tester l'appartenance
+
+        Returns:
+            False si le JTI n'a certainement jamais été ajouté,
+            True s'il a peut-être été ajouté
+        """
+        if not self._bits:
+            return jti in self._set
+
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(jti)
+        )
+
+    def clear(self) -> None:
+        """Vider le filtre (retour en phase set)"""
+        self._set.clear()
+        self._bits = bytearray()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class RotatingTokenFilter:
+    """
+    Filtre en deux générations pour des JTI qui expirent
+
+    Les ajouts vont dans la génération courante. Toutes les `period_seconds`
+    la génération courante devient la précédente et l'ancienne précédente est
+    abandonnée: un JTI reste présent au moins `period_seconds` (au plus le
+    double). Avec une période supérieure à la durée de vie maximale d'un
+    token, aucun token encore valide n'est oublié, et les révocations
+    expirées sortent du filtre sans suivi d'expiration par entrée (taux de
+    faux positifs stable au lieu de croître indéfiniment).
+    """
+
+    def __init__(self, period_seconds: float, **filter_options):
+        self.period_seconds = period_seconds
+        self._filter_options = filter_options
+        self._current = BloomTokenFilter(**filter_options)
+        self._previous = BloomTokenFilter(**filter_options)
+        self._rotated_at = time.monotonic()
+
+    @property
+    def is_bloom(self) -> bool:
+        """True si une des générations est en mode Bloom"""
+        return self._current.is_bloom or self._previous.is_bloom
+
+    def _maybe_rotate(self) -> None:
+        now = time.monotonic()
+        if now - self._rotated_at >= self.period_seconds:
+            self._previous = self._current
+            self._current = BloomTokenFilter(**self._filter_options)
+            self._rotated_at = now
+
+    def add(self, jti: str) -> None:
+        """Ajouter un JTI (génération courante)"""
+        self._maybe_rotate()
+        self._current.add(jti)
+
+    def might_contain(self, jti: str) -> bool:
+        """Tester l'appartenance (False: certainement absent)"""
+        self._maybe_rotate()
+        return self._current.might_contain(jti) or self._previous.might_contain(jti)
+
+    def clear(self) -> None:
+        """Vider les deux générations"""
+        self._current.clear()
+        self._previous.clear()
+        self._rotated_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
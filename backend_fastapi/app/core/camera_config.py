@@ -1,15 +1,26 @@
 """
 Chargement et parsing de la configuration des caméras depuis YAML
 """
+import hashlib
+import os
+import orjson
 import yaml
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from urllib.parse import urlparse
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
 
+from app.core.rtsp_url import split_rtsp_credentials
 from app.schemas.camera import CameraCreate
 
 
+# Backend libyaml (C) si disponible, sinon le loader pur Python
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Version du format du cache JSON (à incrémenter si sa structure change)
+_JSON_CACHE_VERSION = 3
+
+
 class CameraConfig:
     """Configuration d'une caméra depuis YAML"""
 
@@ -20,34 +31,29 @@ class CameraConfig:
         self.enabled = data.get("enabled", True)
         self.zones = data.get("zones", {})
 
-    def extract_credentials_from_url(self) -> tuple[str, str, str]:
+    @cached_property
+    def credentials(self) -> tuple[str, str, str]:
         """
-        Extrait username, password et URL nettoyée depuis l'URL RTSP
-
-        Returns:
-            Tuple (username, password, clean_url)
+        Username, password et URL nettoyée (calculés une seule fois, l'URL
+        ne change pas après chargement)
         """
         try:
-            parsed = urlparse(self.url)
-
-            username = parsed.username or "admin"
-            password = parsed.password or ""
-
-            # Reconstruire l'URL sans credentials
-            clean_url = f"{parsed.scheme}://{parsed.hostname}"
-            if parsed.port:
-                clean_url += f":{parsed.port}"
-            if parsed.path:
-                clean_url += parsed.path
-            if parsed.query:
-                clean_url += f"?{parsed.query}"
-
-            return username, password, clean_url
+            username, password, clean_url = split_rtsp_credentials(self.url)
+            return username or "admin", password, clean_url
 
         except Exception as e:
             logger.error(f"Error parsing RTSP URL: {e}")
             return "admin", "", self.url
 
+    def extract_credentials_from_url(self) -> tuple[str, str, str]:
+        """
+        Extrait username, password et URL nettoyée depuis l'URL RTSP
+
+        Returns:
+            Tuple (username, password, clean_url)
+        """
+        return self.credentials
+
     def to_camera_create(self) -> tuple[CameraCreate, str, str]:
         """
         Convertit la config YAML en CameraCreate schema
@@ -82,37 +88,122 @@ class CameraConfig:
         return camera_create, username, password
 
 
-def load_cameras_config(config_path: str = None) -> List[CameraConfig]:
+def _resolve_config_path(config_path: Optional[str]) -> Path:
+    """Chemin du fichier cameras.yaml (défaut: shared/config à la racine du projet)"""
+    if config_path is None:
+        base_path = Path(__file__).parent.parent.parent.parent  # Remonter à la racine
+        return base_path / "shared" / "config" / "cameras.yaml"
+    return Path(config_path)
+
+
+def _read_yaml(path: Path) -> Dict[str, Any]:
     """
-    Charge la configuration des caméras depuis le fichier YAML
+    Parse le YAML via un cache JSON partagé entre processus
 
-    Args:
-        config_path: Chemin vers le fichier cameras.yaml (optionnel)
+    Le cache est écrit à côté du fichier (`.cameras.yaml.<hash>.json`), le
+    hash portant sur le contenu et la version du format: un fichier modifié
+    ou un format changé ne relit jamais un ancien cache. Les workers suivants
+    relisent le JSON (orjson) au lieu de re-parser le YAML.
 
-    Returns:
-        Liste de CameraConfig
+    Le cache ne contient que des données (jamais de pickle: un fichier
+    déposé dans le dossier de config ne peut pas exécuter de code) et n'est
+    relu que s'il appartient au propriétaire de cameras.yaml.
     """
-    if config_path is None:
-        # Chemin par défaut
-        base_path = Path(__file__).parent.parent.parent.parent  # Remonter à la racine
-        config_path = base_path / "shared" / "config" / "cameras.yaml"
+    content = path.read_bytes()
+    digest = hashlib.blake2b(content, digest_size=8)
+    digest.update(str(_JSON_CACHE_VERSION).encode())
+    prefix = f".{path.name}."
+    cache_path = path.with_name(f"{prefix}{digest.hexdigest()}.json")
+
+    try:
+        if cache_path.stat().st_uid == path.stat().st_uid:
+            return orjson.loads(cache_path.read_bytes())
+        logger.warning(f"Ignoring camera config cache {cache_path.name}: owner differs from {path.name}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable camera config cache {cache_path.name}: {e}")
+
+    data = yaml.load(content, Loader=_YAML_LOADER) or {}
+
+    try:
+        blob = orjson.dumps(data)
+    except TypeError:
+        return data
+    # Types YAML sans équivalent JSON (dates, clés non textuelles...): pas de cache
+    if orjson.loads(blob) != data:
+        return data
 
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        # Écriture atomique (plusieurs workers peuvent démarrer en même temps)
+        # Créé en 0600: le cache contient les URL RTSP avec credentials
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, cache_path)
+
+        # Retirer les caches des versions précédentes du fichier (et les
+        # anciens caches pickle)
+        for stale in (*path.parent.glob(f"{prefix}*.json"), *path.parent.glob(f"{prefix}*.pkl")):
+            if stale != cache_path:
+                stale.unlink(missing_ok=True)
+    except OSError as e:
+        logger.debug("Camera config cache not written: {}", e)
+
+    return data
+
+
+@lru_cache(maxsize=4)
+def _load(path_str: str, mtime_ns: int) -> Tuple[Tuple[CameraConfig, ...], Tuple[CameraConfig, ...]]:
+    """
+    Parse le fichier YAML (mémoïsé par chemin et date de modification)
+
+    Une modification du fichier change `mtime_ns` et force un nouveau parsing.
+
+    Returns:
+        Tuple (toutes les caméras, caméras activées)
+    """
+    data = _read_yaml(Path(path_str))
+
+    cameras = tuple(CameraConfig(cam) for cam in data.get("cameras", []))
+    for camera in cameras:
+        # Parser les URLs au chargement (erreurs journalisées ici, une fois)
+        camera.credentials
+    enabled = tuple(cam for cam in cameras if cam.enabled)
+
+    logger.info(f"Loaded {len(cameras)} cameras from config")
+    return cameras, enabled
 
-        cameras_data = data.get("cameras", [])
-        cameras = [CameraConfig(cam) for cam in cameras_data]
 
-        logger.info(f"Loaded {len(cameras)} cameras from config")
-        return cameras
+def _load_cached(config_path: Optional[str]) -> Tuple[Tuple[CameraConfig, ...], Tuple[CameraConfig, ...]]:
+    path = _resolve_config_path(config_path)
+
+    try:
+        return _load(str(path), path.stat().st_mtime_ns)
 
     except FileNotFoundError:
-        logger.warning(f"Camera config file not found: {config_path}")
-        return []
+        logger.warning(f"Camera config file not found: {path}")
+        return (), ()
     except Exception as e:
         logger.error(f"Error loading camera config: {e}")
-        return []
+        return (), ()
+
+
+def load_cameras_config(config_path: str = None) -> List[CameraConfig]:
+    """
+    Charge la configuration des caméras depuis le fichier YAML
+
+    Le résultat est mis en cache tant que le fichier n'est pas modifié.
+
+    Args:
+        config_path: Chemin vers le fichier cameras.yaml (optionnel)
+
+    Returns:
+        Liste de CameraConfig
+    """
+    cameras, _ = _load_cached(config_path)
+    return list(cameras)
 
 
 def get_enabled_cameras_config(config_path: str = None) -> List[CameraConfig]:
@@ -125,5 +216,5 @@ def get_enabled_cameras_config(config_path: str = None) -> List[CameraConfig]:
     Returns:
         Liste de CameraConfig activées
     """
-    all_cameras = load_cameras_config(config_path)
-    return [cam for cam in all_cameras if cam.enabled]
+    _, enabled = _load_cached(config_path)
+    return list(enabled)
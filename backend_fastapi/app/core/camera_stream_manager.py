@@ -2,14 +2,17 @@
 Gestionnaire central des flux caméras
 Gère les captures RTSP de toutes les caméras actives
 """
-from typing import Dict, Optional, Callable
+from typing import Dict, Optional, Callable, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 from loguru import logger
 import asyncio
 
+from app.core.config import settings
 from app.core.rtsp_capture import RTSPCapture
+from app.core.rtsp_url import build_authenticated_rtsp_url
 from app.services import camera_service
 from app.services.ffmpeg_transcoder import ffmpeg_transcoder
 from app.schemas.camera import CameraStatus
@@ -34,7 +37,18 @@ class CameraStreamManager:
             return
 
         self.captures: Dict[str, RTSPCapture] = {}
-        self.frame_callbacks: Dict[str, list] = {}  # camera_id -> [callbacks]
+        # camera_id -> (callbacks,): tuples remplacés (jamais modifiés sur place),
+        # les threads de capture itèrent donc toujours sur un snapshot cohérent
+        self.frame_callbacks: Dict[str, Tuple[Callable, ...]] = {}
+        # Boucle asyncio de l'application (capturée au démarrage d'une caméra)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Callbacks synchrones (encodage, upload...) exécutés hors du thread
+        # de capture; un seul lot en cours par caméra
+        self._callback_executor = ThreadPoolExecutor(
+            max_workers=settings.MAX_WORKERS,
+            thread_name_prefix="frame-callback"
+        )
+        self._pending_callbacks: Dict[str, Future] = {}
         self._initialized = True
 
         logger.info("CameraStreamManager initialized")
@@ -43,7 +57,8 @@ class CameraStreamManager:
         self,
         db: AsyncSession,
         camera_id: str,
-        on_frame: Optional[Callable] = None
+        on_frame: Optional[Callable] = None,
+        emit_intermediate: bool = False
     ) -> bool:
         """
         Démarrer le stream d'une caméra
@@ -51,11 +66,18 @@ class CameraStreamManager:
         Args:
             db: Session de base de données
             camera_id: ID de la caméra
-            on_frame: Callback optionnel pour chaque frame
+            on_frame: Callback optionnel pour chaque frame (un callback
+                synchrone s'exécute dans un pool, les frames arrivant pendant
+                son exécution sont ignorées)
+            emit_intermediate: Écrire aussi le statut CONNECTING (une écriture
+                DB de plus, utile seulement si l'UI interroge pendant la connexion)
 
         Returns:
             True si démarré avec succès
         """
+        # Les threads de capture y planifient les callbacks async
+        self._loop = asyncio.get_running_loop()
+
         # Vérifier si déjà en cours
         if camera_id in self.captures:
             logger.warning(f"Camera {camera_id} already streaming")
@@ -75,21 +97,10 @@ class CameraStreamManager:
         username, password = camera_service.get_camera_credentials(camera)
 
         # Construire l'URL RTSP avec credentials
-        rtsp_url = camera.url
-        if username and password:
-            # Injecter les credentials dans l'URL si nécessaire
-            if "@" not in rtsp_url and "rtsp://" in rtsp_url:
-                rtsp_url = rtsp_url.replace("rtsp://", f"rtsp://{username}:{password}@")
+        rtsp_url = build_authenticated_rtsp_url(camera.url, username, password)
 
         logger.info(f"Starting camera {camera_id}: {camera.name}")
 
-        # Mettre à jour le statut
-        await camera_service.update_camera_status(
-            db=db,
-            camera_id=camera_id,
-            status=CameraStatus.CONNECTING
-        )
-
         # Créer la capture RTSP
         try:
             logger.info(f"Creating RTSPCapture for {camera_id} with URL: {rtsp_url[:20]}...")
@@ -99,45 +110,38 @@ class CameraStreamManager:
                 on_frame=self._create_frame_handler(camera_id, db),
                 fps=camera.fps or 10
             )
-            logger.info(f"RTSPCapture created, calling start()...")
 
-            # Démarrer la capture
-            start_result = capture.start()
-            logger.info(f"capture.start() returned: {start_result}")
-            if start_result:
-                self.captures[camera_id] = capture
-
-                # Ajouter le callback utilisateur si fourni
-                if on_frame:
-                    if camera_id not in self.frame_callbacks:
-                        self.frame_callbacks[camera_id] = []
-                    self.frame_callbacks[camera_id].append(on_frame)
-
-                # Démarrer le transcodage FFmpeg H265→H264 pour WebRTC
-                logger.info(f"Starting FFmpeg transcoding H265→H264 for camera {camera_id}")
-                transcoding_started = await ffmpeg_transcoder.start_transcoding(
+            # Connexion RTSP (bloquante, dans un thread), lancement FFmpeg
+            # H265→H264 pour WebRTC et statut CONNECTING (optionnel) en parallèle
+            logger.info(f"Starting RTSP capture and FFmpeg transcoding for camera {camera_id}")
+            steps = [
+                asyncio.to_thread(capture.start),
+                ffmpeg_transcoder.start_transcoding(
                     camera_id=camera_id,
                     input_rtsp_url=rtsp_url,
                     output_rtsp_url=f"rtsp://localhost:8554/{camera_id}_h264",
                     fps=camera.fps or 25,
                     bitrate="2M"
+                ),
+            ]
+            if emit_intermediate:
+                steps.append(
+                    camera_service.update_camera_status(db=db, camera_id=camera_id, status=CameraStatus.CONNECTING)
                 )
 
-                if not transcoding_started:
-                    logger.warning(f"Failed to start transcoding for {camera_id}, WebRTC may not work")
+            start_result, transcoding_started, *status_results = await asyncio.gather(
+                *steps, return_exceptions=True
+            )
+            logger.info(f"capture.start() returned: {start_result}")
 
-                # Mettre à jour le statut
-                await camera_service.update_camera_status(
-                    db=db,
-                    camera_id=camera_id,
-                    status=CameraStatus.ACTIVE,
-                    fps=capture.target_fps
-                )
+            for result in (start_result, transcoding_started, *status_results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error starting camera {camera_id}: {result}")
 
-                logger.success(f"Camera {camera_id} started successfully (RTSP capture + FFmpeg transcoding)")
-                return True
-            else:
-                # Échec du démarrage
+            if start_result is not True:
+                # Échec du démarrage: annuler le transcodage éventuellement lancé
+                if transcoding_started is True:
+                    await ffmpeg_transcoder.stop_transcoding(camera_id)
                 await camera_service.update_camera_status(
                     db=db,
                     camera_id=camera_id,
@@ -146,6 +150,26 @@ class CameraStreamManager:
                 logger.error(f"Failed to start camera {camera_id}")
                 return False
 
+            self.captures[camera_id] = capture
+
+            # Ajouter le callback utilisateur si fourni
+            if on_frame:
+                self.frame_callbacks[camera_id] = self.frame_callbacks.get(camera_id, ()) + (on_frame,)
+
+            if transcoding_started is not True:
+                logger.warning(f"Failed to start transcoding for {camera_id}, WebRTC may not work")
+
+            # Mettre à jour le statut
+            await camera_service.update_camera_status(
+                db=db,
+                camera_id=camera_id,
+                status=CameraStatus.ACTIVE,
+                fps=capture.target_fps
+            )
+
+            logger.success(f"Camera {camera_id} started successfully (RTSP capture + FFmpeg transcoding)")
+            return True
+
         except Exception as e:
             import traceback
             logger.error(f"Error starting camera {camera_id}: {e}")
@@ -168,33 +192,52 @@ class CameraStreamManager:
         Returns:
             Fonction callback
         """
-        async def handle_frame(frame: np.ndarray, timestamp: datetime, cam_id: str):
-            """Handler appelé pour chaque nouvelle frame"""
-            try:
-                # Appeler les callbacks utilisateur
-                if cam_id in self.frame_callbacks:
-                    for callback in self.frame_callbacks[cam_id]:
-                        try:
-                            if asyncio.iscoroutinefunction(callback):
-                                await callback(frame, timestamp, cam_id)
-                            else:
-                                callback(frame, timestamp, cam_id)
-                        except Exception as e:
-                            logger.error(f"Error in user callback for {cam_id}: {e}")
-
-            except Exception as e:
-                logger.error(f"Error handling frame for {cam_id}: {e}")
-
-        # Wrapper synchrone car RTSPCapture utilise des threads
+        def log_callback_error(future: "asyncio.Future"):
+            """Journaliser l'erreur d'un callback async planifié"""
+            if not future.cancelled() and future.exception() is not None:
+                logger.error("Error in user callback for {}: {}", camera_id, future.exception())
+
+        def run_sync_callbacks(callbacks, frame: np.ndarray, timestamp: datetime, cam_id: str):
+            for callback in callbacks:
+                try:
+                    callback(frame, timestamp, cam_id)
+                except Exception as e:
+                    logger.error("Error in user callback for {}: {}", cam_id, e)
+
+        # Appelé depuis le thread RTSPCapture pour chaque nouvelle frame
         def sync_wrapper(frame: np.ndarray, timestamp: datetime, cam_id: str):
-            import asyncio
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(handle_frame(frame, timestamp, cam_id))
-                loop.close()
-            except Exception as e:
-                logger.error(f"Error in frame handler wrapper: {e}")
+            sync_callbacks = []
+            async_frame = None
+            for callback in self.frame_callbacks.get(cam_id, ()):
+                try:
+                    if asyncio.iscoroutinefunction(callback):
+                        # La coroutine s'exécute plus tard sur la boucle: copie
+                        # (une seule par frame), le buffer de capture est réécrit
+                        # deux frames plus tard
+                        if async_frame is None:
+                            async_frame = frame.copy()
+                        # Fire-and-forget sur la boucle principale (pas de loop par frame)
+                        future = asyncio.run_coroutine_threadsafe(
+                            callback(async_frame, timestamp, cam_id), self._loop
+                        )
+                        future.add_done_callback(log_callback_error)
+                    else:
+                        sync_callbacks.append(callback)
+                except Exception as e:
+                    logger.error("Error in user callback for {}: {}", cam_id, e)
+
+            if not sync_callbacks:
+                return
+
+            # Lot précédent encore en cours: frame ignorée, la capture n'attend pas
+            pending = self._pending_callbacks.get(cam_id)
+            if pending is not None and not pending.done():
+                return
+
+            # Copie: le buffer de capture est réécrit deux frames plus tard
+            self._pending_callbacks[cam_id] = self._callback_executor.submit(
+                run_sync_callbacks, sync_callbacks, frame.copy(), timestamp, cam_id
+            )
 
         return sync_wrapper
 
@@ -209,26 +252,16 @@ class CameraStreamManager:
         Returns:
             True si arrêté avec succès
         """
-        if camera_id not in self.captures:
+        # Retirée avant l'arrêt: un second appel concurrent ne trouve plus rien
+        capture = self.captures.pop(camera_id, None)
+        if capture is None:
             logger.warning(f"Camera {camera_id} not streaming")
             return True
 
         logger.info(f"Stopping camera {camera_id}")
 
         try:
-            # Arrêter le transcodage FFmpeg
-            await ffmpeg_transcoder.stop_transcoding(camera_id)
-
-            # Arrêter la capture
-            capture = self.captures[camera_id]
-            capture.stop()
-
-            # Retirer de la liste
-            del self.captures[camera_id]
-
-            # Nettoyer les callbacks
-            if camera_id in self.frame_callbacks:
-                del self.frame_callbacks[camera_id]
+            await self._release_camera(camera_id, capture)
 
             # Mettre à jour le statut
             await camera_service.update_camera_status(
@@ -244,6 +277,26 @@ class CameraStreamManager:
             logger.error(f"Error stopping camera {camera_id}: {e}")
             return False
 
+    async def _release_camera(self, camera_id: str, capture: RTSPCapture) -> None:
+        """
+        Libérer les ressources d'une caméra déjà retirée de `captures`
+        (sans toucher à la DB)
+
+        Le transcodage FFmpeg et la capture (join bloquant, dans un thread)
+        sont arrêtés en parallèle.
+
+        Args:
+            camera_id: ID de la caméra
+            capture: Capture RTSP de la caméra
+        """
+        self.frame_callbacks.pop(camera_id, None)
+        self._pending_callbacks.pop(camera_id, None)
+
+        await asyncio.gather(
+            ffmpeg_transcoder.stop_transcoding(camera_id),
+            asyncio.to_thread(capture.stop)
+        )
+
     def get_camera_frame(self, camera_id: str) -> Optional[tuple[np.ndarray, datetime]]:
         """
         Récupérer la dernière frame d'une caméra
@@ -254,10 +307,11 @@ class CameraStreamManager:
         Returns:
             Tuple (frame, timestamp) ou None
         """
-        if camera_id not in self.captures:
+        capture = self.captures.get(camera_id)
+        if capture is None:
             return None
 
-        return self.captures[camera_id].get_last_frame()
+        return capture.get_last_frame()
 
     def get_camera_stats(self, camera_id: str) -> Optional[dict]:
         """
@@ -269,10 +323,11 @@ class CameraStreamManager:
         Returns:
             Dict avec stats ou None
         """
-        if camera_id not in self.captures:
+        capture = self.captures.get(camera_id)
+        if capture is None:
             return None
 
-        return self.captures[camera_id].get_stats()
+        return capture.get_stats()
 
     def get_all_stats(self) -> dict:
         """
@@ -290,9 +345,28 @@ class CameraStreamManager:
         """Arrêter toutes les caméras"""
         logger.info("Stopping all cameras")
 
-        camera_ids = list(self.captures.keys())
-        for camera_id in camera_ids:
-            await self.stop_camera(db, camera_id)
+        # Libération des ressources en parallèle (durée = caméra la plus lente)
+        captures, self.captures = self.captures, {}
+        camera_ids = list(captures)
+        results = await asyncio.gather(
+            *(self._release_camera(camera_id, capture) for camera_id, capture in captures.items()),
+            return_exceptions=True
+        )
+
+        # Statuts mis à jour ensuite: la session DB ne supporte pas les accès concurrents
+        for camera_id, result in zip(camera_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error stopping camera {camera_id}: {result}")
+                continue
+
+            try:
+                await camera_service.update_camera_status(
+                    db=db,
+                    camera_id=camera_id,
+                    status=CameraStatus.INACTIVE
+                )
+            except Exception as e:
+                logger.error(f"Error updating status of camera {camera_id}: {e}")
 
         logger.info("All cameras stopped")
 
@@ -4,7 +4,8 @@ Compatible avec la configuration existante de Sentinel IA
 """
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 import os
 
 
@@ -35,12 +36,71 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 heures
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7  # 7 jours
+    BCRYPT_ROUNDS: int = Field(
+        default=10,
+        ge=4,
+        le=31,
+        description="Facteur de coût bcrypt (les hashs de coût inférieur sont migrés à la connexion)"
+    )
+    JWT_CACHE_TTL_SECONDS: int = Field(
+        default=60,
+        ge=0,
+        description="Durée de cache des tokens décodés (0 = désactivé)"
+    )
+    JWT_CACHE_MAX_SIZE: int = Field(
+        default=10000,
+        ge=0,
+        description="Nombre max de tokens gardés en cache"
+    )
+
+    # Cache des caméras (GET /cameras)
+    CAMERA_LIST_CACHE_TTL_SECONDS: int = Field(
+        default=30,
+        ge=0,
+        description="Durée de cache de la liste des caméras (0 = désactivé)"
+    )
+    CAMERA_DETAIL_CACHE_TTL_SECONDS: int = Field(
+        default=60,
+        ge=0,
+        description="Durée de cache du détail d'une caméra (0 = désactivé)"
+    )
+    CAMERA_CACHE_STALE_SECONDS: int = Field(
+        default=300,
+        ge=0,
+        description="Durée pendant laquelle une réponse périmée est servie si la base est indisponible"
+    )
+
+    # Redis (blacklist des tokens partagée entre workers)
+    REDIS_URL: Optional[str] = Field(
+        default=None,
+        description="URL Redis (ex: redis://localhost:6379/0), blacklist en mémoire si absent"
+    )
 
     # Database - SQLite (Auth)
     SQLITE_DB_PATH: str = Field(
         default="../data/users.db",
         description="Chemin vers la base SQLite utilisateurs"
     )
+    DATABASE_URL: Optional[str] = Field(
+        default=None,
+        description="URL SQLAlchemy async (ex: postgresql+asyncpg://...), remplace SQLITE_DB_PATH si définie"
+    )
+    SQLITE_BUSY_TIMEOUT: float = Field(
+        default=30.0,
+        ge=0,
+        description="Attente max du verrou d'écriture SQLite en secondes"
+    )
+    DB_POOL_SIZE: int = Field(default=20, ge=1, description="Taille du pool de connexions (hors SQLite en mémoire)")
+    DB_MAX_OVERFLOW: int = Field(default=10, ge=0, description="Connexions supplémentaires au-delà du pool")
+    DB_POOL_RECYCLE: int = Field(
+        default=1800,
+        description="Durée de vie max d'une connexion en secondes (-1 = illimitée)"
+    )
+    DB_PGBOUNCER: bool = Field(
+        default=False,
+        description="Désactiver le cache de requêtes préparées asyncpg (pgbouncer en mode transaction)"
+    )
+    SQLALCHEMY_ECHO: bool = Field(default=False, description="Logger les requêtes SQL")
 
     # Database - ClickHouse (Events)
     CLICKHOUSE_HOST: str = Field(default="localhost", description="Host ClickHouse")
@@ -48,6 +108,11 @@ class Settings(BaseSettings):
     CLICKHOUSE_USER: str = Field(default="default", description="User ClickHouse")
     CLICKHOUSE_PASSWORD: str = Field(default="", description="Password ClickHouse")
     CLICKHOUSE_DATABASE: str = Field(default="sentinel", description="Database ClickHouse")
+    EVENT_STATS_CACHE_TTL_SECONDS: int = Field(
+        default=5,
+        ge=0,
+        description="Durée de cache des statistiques d'événements (0 = désactivé)"
+    )
 
     # Storage - MinIO
     MINIO_ENDPOINT: str = Field(default="localhost:9000", description="Endpoint MinIO")
@@ -98,6 +163,20 @@ class Settings(BaseSettings):
         description="Activer l'accélération GPU"
     )
 
+    # Décodage RTSP (backend FFmpeg d'OpenCV)
+    RTSP_TRANSPORT: str = Field(
+        default="tcp",
+        description="Transport RTSP (tcp, udp)"
+    )
+    RTSP_HWACCEL: Optional[str] = Field(
+        default=None,
+        description="Décodage matériel FFmpeg (cuda, vaapi, qsv...); None = décodage CPU"
+    )
+    RTSP_HWACCEL_CODEC: Optional[str] = Field(
+        default=None,
+        description="Décodeur FFmpeg forcé (ex: h264_cuvid, hevc_cuvid)"
+    )
+
     # WebSocket
     WS_HEARTBEAT_INTERVAL: int = Field(
         default=30,
@@ -113,6 +192,10 @@ class Settings(BaseSettings):
         default="INFO",
         description="Niveau de log (DEBUG, INFO, WARNING, ERROR)"
     )
+    LOG_CONSOLE_LEVEL: Optional[str] = Field(
+        default=None,
+        description="Niveau de log console (ex: WARNING en production); None = LOG_LEVEL"
+    )
     LOG_FILE: str = Field(
         default="../logs/sentinel_api.log",
         description="Fichier de log"
@@ -126,7 +209,9 @@ class Settings(BaseSettings):
     )
 
     def get_database_url(self) -> str:
-        """Retourne l'URL de connexion SQLite pour SQLAlchemy"""
+        """Retourne l'URL de connexion async pour SQLAlchemy (SQLite par défaut)"""
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"sqlite+aiosqlite:///{self.SQLITE_DB_PATH}"
 
     def get_clickhouse_url(self) -> str:
@@ -135,13 +220,23 @@ class Settings(BaseSettings):
         return f"clickhouse://{auth}{self.CLICKHOUSE_HOST}:{self.CLICKHOUSE_PORT}/{self.CLICKHOUSE_DATABASE}"
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings chargés une seule fois (environnement + .env)"""
+    return Settings()
+
+
 # Instance globale des settings
-settings = Settings()
+settings = get_settings()
 
 
-# Créer les dossiers nécessaires au démarrage
 def ensure_directories():
-    """Crée les dossiers nécessaires s'ils n'existent pas"""
+    """
+    Crée les dossiers nécessaires s'ils n'existent pas
+
+    Appelé au démarrage de l'application (setup_logging), pas à l'import:
+    scripts et outils qui importent la config ne créent aucun dossier.
+    """
     directories = [
         os.path.dirname(settings.SQLITE_DB_PATH),
         os.path.dirname(settings.LOG_FILE),
@@ -150,7 +245,3 @@ def ensure_directories():
     ]
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
-
-
-# Exécuter au chargement du module
-ensure_directories()
@@ -3,8 +3,11 @@ Initialisation des caméras depuis la configuration YAML
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
+import asyncio
 
+from app.core.config import settings
 from app.core.camera_config import get_enabled_cameras_config
+from app.db.session import AsyncSessionLocal
 from app.services import camera_service
 from app.core.camera_stream_manager import camera_stream_manager
 
@@ -13,6 +16,9 @@ async def init_cameras_from_config(db: AsyncSession) -> int:
     """
     Initialise les caméras depuis le fichier cameras.yaml
 
+    Toutes les créations sont validées par un seul commit; chaque caméra
+    est écrite dans un SAVEPOINT, une erreur n'annule que cette caméra.
+
     Args:
         db: Session de base de données
 
@@ -30,9 +36,14 @@ async def init_cameras_from_config(db: AsyncSession) -> int:
 
     created_count = 0
 
+    # Caméras déjà en base: une seule requête pour toute la config
+    existing_map = await camera_service.get_cameras_by_ids(
+        db, (camera_config.id for camera_config in camera_configs)
+    )
+
     for camera_config in camera_configs:
         # Vérifier si la caméra existe déjà
-        existing = await camera_service.get_camera_by_id(db, camera_config.id)
+        existing = existing_map.get(camera_config.id)
 
         if existing:
             # Vérifier si les credentials peuvent être déchiffrés
@@ -41,36 +52,43 @@ async def init_cameras_from_config(db: AsyncSession) -> int:
             if username and password:
                 logger.info(f"Camera {camera_config.id} already exists with valid credentials, skipping")
                 continue
-            else:
-                # Credentials invalides - supprimer et recréer
-                logger.warning(f"Camera {camera_config.id} has invalid encrypted credentials (decryption returned empty), recreating...")
-                await camera_service.delete_camera(db, camera_config.id)
-                logger.info(f"Deleted camera {camera_config.id} with corrupted credentials")
-
-        # Convertir en CameraCreate et extraire credentials
-        camera_create, username, password = camera_config.to_camera_create()
+            # Credentials invalides - supprimer et recréer
+            logger.warning(f"Camera {camera_config.id} has invalid encrypted credentials (decryption returned empty), recreating...")
 
         try:
-            # Créer la caméra avec l'ID depuis le YAML
-            camera = await camera_service.create_camera(
-                db=db,
-                camera_data=camera_create,
-                username=username,
-                password=password,
-                camera_type="imou"
-            )
-
-            # Forcer l'ID depuis la config YAML
-            camera.id = camera_config.id
-            await db.commit()
-            await db.refresh(camera)
+            async with db.begin_nested():
+                if existing:
+                    await camera_service.delete_camera(db, camera_config.id, commit=False)
+                    await db.flush()
+                    logger.info(f"Deleted camera {camera_config.id} with corrupted credentials")
+
+                # Convertir en CameraCreate et extraire credentials
+                camera_create, username, password = camera_config.to_camera_create()
+
+                # Créer la caméra avec l'ID depuis le YAML
+                camera = await camera_service.create_camera(
+                    db=db,
+                    camera_data=camera_create,
+                    username=username,
+                    password=password,
+                    camera_type="imou",
+                    camera_id=camera_config.id,
+                    commit=False
+                )
 
             logger.info(f"Created camera: {camera.id} - {camera.name}")
             created_count += 1
 
         except Exception as e:
             logger.error(f"Error creating camera {camera_config.id}: {e}")
-            await db.rollback()
+
+    try:
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Error committing cameras from config: {e}")
+        await db.rollback()
+        return 0
+    camera_service.invalidate_camera_cache()
 
     logger.info(f"Initialized {created_count} cameras from config")
     return created_count
@@ -79,7 +97,8 @@ async def init_cameras_from_config(db: AsyncSession) -> int:
 async def sync_cameras_with_config(db: AsyncSession) -> dict:
     """
     Synchronise les caméras en base avec la configuration YAML
-    Ajoute les nouvelles, met à jour les existantes
+    Ajoute les nouvelles, met à jour les existantes (un seul commit,
+    un SAVEPOINT par caméra)
 
     Args:
         db: Session de base de données
@@ -97,9 +116,14 @@ async def sync_cameras_with_config(db: AsyncSession) -> dict:
         "errors": 0
     }
 
+    # Caméras déjà en base: une seule requête pour toute la config
+    existing_map = await camera_service.get_cameras_by_ids(
+        db, (camera_config.id for camera_config in camera_configs)
+    )
+
     for camera_config in camera_configs:
         try:
-            existing = await camera_service.get_camera_by_id(db, camera_config.id)
+            existing = existing_map.get(camera_config.id)
             camera_create, username, password = camera_config.to_camera_create()
 
             if existing:
@@ -113,29 +137,31 @@ async def sync_cameras_with_config(db: AsyncSession) -> dict:
                         detection_zones=camera_create.detection_zones
                     )
 
-                    await camera_service.update_camera(
-                        db=db,
-                        camera_id=camera_config.id,
-                        camera_data=update_data,
-                        username=username,
-                        password=password
-                    )
+                    async with db.begin_nested():
+                        await camera_service.update_camera(
+                            db=db,
+                            camera_id=camera_config.id,
+                            camera_data=update_data,
+                            username=username,
+                            password=password,
+                            commit=False
+                        )
                     logger.info(f"Updated camera: {camera_config.id}")
                     stats["updated"] += 1
                 else:
                     stats["skipped"] += 1
             else:
                 # Créer nouvelle caméra
-                camera = await camera_service.create_camera(
-                    db=db,
-                    camera_data=camera_create,
-                    username=username,
-                    password=password,
-                    camera_type="imou"
-                )
-                camera.id = camera_config.id
-                await db.commit()
-                await db.refresh(camera)
+                async with db.begin_nested():
+                    camera = await camera_service.create_camera(
+                        db=db,
+                        camera_data=camera_create,
+                        username=username,
+                        password=password,
+                        camera_type="imou",
+                        camera_id=camera_config.id,
+                        commit=False
+                    )
 
                 logger.info(f"Created camera: {camera.id} - {camera.name}")
                 stats["created"] += 1
@@ -143,7 +169,15 @@ async def sync_cameras_with_config(db: AsyncSession) -> dict:
         except Exception as e:
             logger.error(f"Error syncing camera {camera_config.id}: {e}")
             stats["errors"] += 1
-            await db.rollback()
+
+    try:
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Error committing camera sync: {e}")
+        await db.rollback()
+        stats["errors"] += stats["created"] + stats["updated"]
+        stats["created"] = stats["updated"] = 0
+    camera_service.invalidate_camera_cache()
 
     logger.info(f"Sync complete: {stats}")
     return stats
@@ -153,8 +187,12 @@ async def autostart_enabled_cameras(db: AsyncSession) -> int:
     """
     Démarre automatiquement toutes les caméras activées au démarrage du backend
 
+    Les caméras démarrent en parallèle (au plus MAX_WORKERS connexions RTSP
+    simultanées), chacune avec sa propre session: une AsyncSession ne
+    supporte pas les accès concurrents.
+
     Args:
-        db: Session de base de données
+        db: Session de base de données (lecture de la liste des caméras)
 
     Returns:
         Nombre de caméras démarrées avec succès
@@ -168,26 +206,32 @@ async def autostart_enabled_cameras(db: AsyncSession) -> int:
         logger.warning("No enabled cameras to start")
         return 0
 
-    started_count = 0
+    semaphore = asyncio.Semaphore(settings.MAX_WORKERS)
 
-    for camera in cameras:
-        try:
-            logger.info(f"Auto-starting camera: {camera.id} - {camera.name}")
+    async def start(camera_id: str, camera_name: str) -> bool:
+        async with semaphore:
+            try:
+                logger.info(f"Auto-starting camera: {camera_id} - {camera_name}")
 
-            # Démarrer le stream via le stream manager
-            success = await camera_stream_manager.start_camera(
-                db=db,
-                camera_id=camera.id
-            )
+                # Démarrer le stream via le stream manager
+                async with AsyncSessionLocal() as camera_db:
+                    success = await camera_stream_manager.start_camera(
+                        db=camera_db,
+                        camera_id=camera_id
+                    )
 
-            if success:
-                logger.success(f"Camera {camera.id} auto-started successfully")
-                started_count += 1
-            else:
-                logger.error(f"Failed to auto-start camera {camera.id}")
+                if success:
+                    logger.success(f"Camera {camera_id} auto-started successfully")
+                else:
+                    logger.error(f"Failed to auto-start camera {camera_id}")
+                return success
 
-        except Exception as e:
-            logger.error(f"Error auto-starting camera {camera.id}: {e}")
+            except Exception as e:
+                logger.error(f"Error auto-starting camera {camera_id}: {e}")
+                return False
+
+    results = await asyncio.gather(*(start(camera.id, camera.name) for camera in cameras))
+    started_count = sum(results)
 
     logger.info(f"Auto-started {started_count}/{len(cameras)} cameras")
     return started_count
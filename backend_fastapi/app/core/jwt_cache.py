@@ -0,0 +1,80 @@
+"""
+Cache des tokens JWT décodés
+
+Associe un token (haché) à son payload et à un instantané de l'utilisateur,
+ce qui évite la vérification de signature et la requête SQL à chaque
+requête authentifiée. La durée de vie est bornée par JWT_CACHE_TTL_SECONDS
+pour que les changements de rôle/statut soient pris en compte rapidement.
+"""
+import hashlib
+import time
+from typing import Optional, Dict, Any, Tuple
+
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache
+
+
+class JWTCache:
+    """
+    Cache en mémoire (token -> payload, données utilisateur)
+
+    Les tokens ne sont jamais stockés en clair, seule une empreinte BLAKE2b
+    sert de clé.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Récupérer le payload et l'utilisateur associés à un token
+
+        Args:
+            token: Token JWT brut
+
+        Returns:
+            Tuple (payload, user_data) ou None si absent/expiré
+        """
+        return self._cache.get(self._key(token))
+
+    def set(self, token: str, payload: Dict[str, Any], user_data: Dict[str, Any]) -> None:
+        """
+        Mettre en cache un token validé
+
+        Args:
+            token: Token JWT brut
+            payload: Payload décodé du token
+            user_data: Colonnes de l'utilisateur (sans le hash du mot de passe)
+        """
+        ttl = self.ttl_seconds
+        exp = payload.get("exp")
+        if exp:
+            # Ne jamais garder un token au-delà de son expiration
+            ttl = min(ttl, exp - time.time())
+
+        self._cache.set(self._key(token), (payload, user_data), ttl=ttl)
+
+    def invalidate(self, token: str) -> None:
+        """
+        Retirer un token du cache (logout)
+
+        Args:
+            token: Token JWT brut
+        """
+        self._cache.pop(self._key(token))
+
+    def clear(self) -> None:
+        """Vider le cache"""
+        self._cache.clear()
+
+
+# Instance globale (singleton)
+jwt_cache = JWTCache(
+    max_size=settings.JWT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.JWT_CACHE_TTL_SECONDS,
+)
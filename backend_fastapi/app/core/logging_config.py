@@ -4,7 +4,7 @@ Configuration du système de logging avec Loguru
 """
 import sys
 from loguru import logger
-from app.core.config import settings
+from app.core.config import settings, ensure_directories
 
 
 def setup_logging():
@@ -13,7 +13,14 @@ def setup_logging():
     - Console (avec couleurs)
     - Fichier principal (sentinel_api.log)
     - Fichier erreurs (sentinel_errors.log)
+
+    Tous les handlers utilisent `enqueue=True`: les écritures sont faites par
+    un thread dédié, l'appelant (event loop, threads de capture) ne fait que
+    déposer le message dans une file.
     """
+    # Dossiers des logs et de la base SQLite
+    ensure_directories()
+
     # Supprimer le handler par défaut
     logger.remove()
 
@@ -33,12 +40,14 @@ def setup_logging():
         "{message}"
     )
 
-    # Handler console (avec couleurs)
+    # Handler console (avec couleurs): le formatage ANSI est coûteux, son
+    # niveau peut être relevé indépendamment des fichiers
     logger.add(
         sys.stderr,
         format=log_format,
-        level=settings.LOG_LEVEL,
+        level=settings.LOG_CONSOLE_LEVEL or settings.LOG_LEVEL,
         colorize=True,
+        enqueue=True,
     )
 
     # Handler fichier principal (rotation 10MB, garde 7 jours)
@@ -50,6 +59,7 @@ def setup_logging():
         retention="7 days",
         compression="zip",
         encoding="utf-8",
+        enqueue=True,
     )
 
     # Handler fichier erreurs uniquement
@@ -62,6 +72,7 @@ def setup_logging():
         retention="30 days",
         compression="zip",
         encoding="utf-8",
+        enqueue=True,
     )
 
     logger.info(f"Logging configured: {settings.LOG_LEVEL} level")
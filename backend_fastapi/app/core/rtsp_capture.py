@@ -3,15 +3,62 @@ Service de capture RTSP pour caméras IP
 Utilise OpenCV pour lire les flux RTSP
 """
 import cv2
-import asyncio
 from typing import Optional, Callable
-from datetime import datetime
+from datetime import datetime, timedelta
 import numpy as np
 from loguru import logger
+import os
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
+from app.core.config import settings
+
+
+def _ffmpeg_capture_options() -> str:
+    """
+    Options FFmpeg pour OpenCV (format "clé;valeur|clé;valeur")
+
+    OpenCV lit OPENCV_FFMPEG_CAPTURE_OPTIONS à chaque ouverture; une fois la
+    variable définie, son transport TCP par défaut ne s'applique plus, il est
+    donc repris ici explicitement.
+    """
+    options = [("rtsp_transport", settings.RTSP_TRANSPORT)]
+    if settings.RTSP_HWACCEL:
+        # Décodage sur le GPU (NVDEC, VAAPI, QSV) au lieu du CPU
+        options.append(("hwaccel", settings.RTSP_HWACCEL))
+    if settings.RTSP_HWACCEL_CODEC:
+        options.append(("video_codec", settings.RTSP_HWACCEL_CODEC))
+    return "|".join(f"{key};{value}" for key, value in options)
+
+
+# Une valeur définie dans l'environnement reste prioritaire
+os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", _ffmpeg_capture_options())
+
+
+def _readonly_view(frame: np.ndarray) -> np.ndarray:
+    """Vue non modifiable d'un buffer (aucune copie des pixels)"""
+    view = frame.view()
+    view.flags.writeable = False
+    return view
+
+
+# Pool partagé par toutes les caméras pour les ouvertures RTSP (bloquantes):
+# pas de thread créé puis détruit à chaque connexion, nombre de threads borné
+_connect_executor = ThreadPoolExecutor(
+    max_workers=settings.MAX_WORKERS,
+    thread_name_prefix="rtsp-connect"
+)
+
+
+def _release_late_capture(future) -> None:
+    """Libérer une connexion aboutie après le timeout (plus personne ne l'attend)"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    cap, _ = future.result()
+    if cap is not None:
+        cap.release()
+
 
 class RTSPCapture:
     """
@@ -19,6 +66,16 @@ class RTSPCapture:
     Thread-safe avec async/await
     """
 
+    # Délai max d'une lecture bloquée avant que cap.read() échoue
+    READ_TIMEOUT_MS = 5000
+
+    # Attente après un échec de lecture, doublée à chaque échec consécutif
+    ERROR_BACKOFF_MIN = 0.1
+    ERROR_BACKOFF_MAX = 5.0
+
+    # Frames sautées (grab sans décodage) après une reconnexion
+    RECONNECT_FLUSH_FRAMES = 2
+
     def __init__(
         self,
         camera_id: str,
@@ -32,24 +89,64 @@ class RTSPCapture:
         Args:
             camera_id: ID unique de la caméra
             rtsp_url: URL RTSP complète avec credentials
-            on_frame: Callback appelé pour chaque frame (frame_array, timestamp)
+            on_frame: Callback appelé pour chaque frame (frame_array, timestamp).
+                La frame est une vue en lecture seule d'un buffer réutilisé par
+                la capture: la copier pour la modifier (overlays) ou la
+                conserver au-delà de la frame suivante.
             fps: FPS cible pour la capture (défaut: 10)
         """
         self.camera_id = camera_id
         self.rtsp_url = rtsp_url
         self.on_frame = on_frame
         self.target_fps = fps
-        self.frame_interval = 1.0 / fps  # Intervalle entre frames en secondes
+        self.frame_interval_ns = int(1e9 / fps)  # Intervalle entre frames (ns)
 
         self.capture: Optional[cv2.VideoCapture] = None
         self.is_running = False
         self.thread: Optional[threading.Thread] = None
-        self.last_frame: Optional[np.ndarray] = None
-        self.last_frame_time: Optional[datetime] = None
+        # Horodatage monotone de la dernière frame (datetime calculé à la demande)
+        self._last_frame_ns: Optional[int] = None
+
+        # Double buffer: cap.read() décode dans le buffer inactif, puis les
+        # index sont échangés sous verrou (aucune allocation par frame)
+        self._buffers: Optional[list] = None
+        self._active = 0
+        self._swap_lock = threading.Lock()
+        # Incrémenté à chaque frame publiée (détection d'un buffer réécrit)
+        self.frame_generation = 0
         self.frame_count = 0
         self.error_count = 0
+        self._error_backoff = self.ERROR_BACKOFF_MIN
         self.actual_fps = 0.0
 
+    def _open_capture(self, open_timeout: float = 10) -> cv2.VideoCapture:
+        """
+        Ouvrir le flux RTSP avec les paramètres de décodage
+
+        L'accélération matérielle et les timeouts doivent être passés à
+        l'ouverture (un set() après coup est ignoré par le backend FFmpeg).
+        Avec VIDEO_ACCELERATION_ANY, FFmpeg choisit NVDEC/QSV/VAAPI/D3D11 si
+        disponible et retombe sur le décodage CPU sinon.
+
+        Args:
+            open_timeout: Timeout d'ouverture en secondes
+        """
+        params = [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.READ_TIMEOUT_MS,
+        ]
+        # Accélération choisie explicitement (RTSP_HWACCEL) ou laissée à OpenCV
+        if settings.ENABLE_GPU and not settings.RTSP_HWACCEL:
+            params += [
+                cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY,
+                cv2.CAP_PROP_HW_DEVICE, 0,
+            ]
+
+        cap = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG, params)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        cap.set(cv2.CAP_PROP_FPS, self.target_fps)
+        return cap
+
     def _connect_with_timeout(self, timeout: int = 10) -> tuple[bool, Optional[np.ndarray]]:
         """
         Connexion RTSP avec timeout pour éviter le blocage
@@ -62,9 +159,7 @@ class RTSPCapture:
         """
         def connect():
             try:
-                cap = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                cap.set(cv2.CAP_PROP_FPS, self.target_fps)
+                cap = self._open_capture(open_timeout=timeout)
 
                 if not cap.isOpened():
                     return None, None
@@ -79,17 +174,18 @@ class RTSPCapture:
                 logger.error(f"Connection error: {e}")
                 return None, None
 
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(connect)
-            try:
-                cap, frame = future.result(timeout=timeout)
-                if cap is not None:
-                    self.capture = cap
-                    return True, frame
-                return False, None
-            except FuturesTimeoutError:
-                logger.error(f"Connection timeout after {timeout}s for {self.camera_id}")
-                return False, None
+        # Pas de `with`: sa sortie attendrait la fin d'une connexion bloquée
+        future = _connect_executor.submit(connect)
+        try:
+            cap, frame = future.result(timeout=timeout)
+            if cap is not None:
+                self.capture = cap
+                return True, frame
+            return False, None
+        except FuturesTimeoutError:
+            logger.error(f"Connection timeout after {timeout}s for {self.camera_id}")
+            future.add_done_callback(_release_late_capture)
+            return False, None
 
     def start(self) -> bool:
         """
@@ -113,6 +209,10 @@ class RTSPCapture:
 
             logger.success(f"RTSP connection established: {self.camera_id} ({frame.shape[1]}x{frame.shape[0]})")
 
+            # Buffers dimensionnés d'après la première frame
+            self._buffers = [frame, np.empty_like(frame)]
+            self._active = 0
+
             # Démarrer le thread de capture
             self.is_running = True
             self.thread = threading.Thread(target=self._capture_loop, daemon=True)
@@ -131,40 +231,54 @@ class RTSPCapture:
         Boucle de capture dans un thread séparé
         """
         logger.info(f"Starting capture loop for {self.camera_id}")
-        last_capture_time = datetime.now()
+        # Horloge monotone en entiers (ns): ni objet datetime ni timedelta par
+        # itération, insensible aux sauts d'heure système
+        last_capture_ns = time.monotonic_ns()
 
         while self.is_running:
             try:
                 # Limiter le FPS
-                elapsed = (datetime.now() - last_capture_time).total_seconds()
-                if elapsed < self.frame_interval:
-                    sleep_time = self.frame_interval - elapsed
-                    time.sleep(sleep_time)  # Utiliser time.sleep dans un thread
+                now_ns = time.monotonic_ns()
+                elapsed_ns = now_ns - last_capture_ns
+                if elapsed_ns < self.frame_interval_ns:
+                    time.sleep((self.frame_interval_ns - elapsed_ns) / 1e9)  # Utiliser time.sleep dans un thread
                     continue
 
-                last_capture_time = datetime.now()
+                last_capture_ns = now_ns
 
-                # Lire une frame
-                ret, frame = self.capture.read()
+                # Lire une frame dans le buffer inactif
+                target = self._buffers[1 - self._active]
+                ret, frame = self.capture.read(target)
 
                 if not ret or frame is None:
                     self.error_count += 1
-                    logger.warning(f"Failed to read frame from {self.camera_id} (errors: {self.error_count})")
+                    logger.warning("Failed to read frame from {} (errors: {})", self.camera_id, self.error_count)
 
                     # Trop d'erreurs consécutives -> reconnexion
                     if self.error_count > 10:
-                        logger.error(f"Too many errors, reconnecting {self.camera_id}")
+                        logger.error("Too many errors, reconnecting {}", self.camera_id)
                         self._reconnect()
+                    else:
+                        # Backoff exponentiel: pas de lecture en boucle sur un flux mort
+                        time.sleep(self._error_backoff)
+                        self._error_backoff = min(self.ERROR_BACKOFF_MAX, self._error_backoff * 2)
 
                     continue
 
                 # Reset error count on success
                 self.error_count = 0
+                self._error_backoff = self.ERROR_BACKOFF_MIN
                 self.frame_count += 1
 
-                # Sauvegarder la dernière frame
-                self.last_frame = frame.copy()
-                self.last_frame_time = datetime.now()
+                # Résolution changée (reconnexion): OpenCV a alloué un nouveau buffer
+                if frame is not target:
+                    self._buffers[1 - self._active] = frame
+
+                # Publier la frame: échange des buffers
+                with self._swap_lock:
+                    self._active = 1 - self._active
+                    self._last_frame_ns = time.monotonic_ns()
+                    self.frame_generation += 1
 
                 # Calculer FPS réel
                 if self.frame_count % 30 == 0:  # Calculer toutes les 30 frames
@@ -173,12 +287,12 @@ class RTSPCapture:
                 # Callback avec la frame
                 if self.on_frame:
                     try:
-                        self.on_frame(frame, self.last_frame_time, self.camera_id)
+                        self.on_frame(_readonly_view(frame), datetime.now(), self.camera_id)
                     except Exception as e:
-                        logger.error(f"Error in frame callback for {self.camera_id}: {e}")
+                        logger.error("Error in frame callback for {}: {}", self.camera_id, e)
 
             except Exception as e:
-                logger.error(f"Error in capture loop for {self.camera_id}: {e}")
+                logger.error("Error in capture loop for {}: {}", self.camera_id, e)
                 self.error_count += 1
                 time.sleep(1)  # Utiliser time.sleep dans un thread
 
@@ -194,11 +308,14 @@ class RTSPCapture:
 
             time.sleep(2)  # Attendre avant de reconnecter
 
-            self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
-            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            self.capture.set(cv2.CAP_PROP_FPS, self.target_fps)
+            self.capture = self._open_capture()
 
             if self.capture.isOpened():
+                # Vider le tampon FFmpeg sans décoder (grab seul) avant de reprendre
+                for _ in range(self.RECONNECT_FLUSH_FRAMES):
+                    if not self.capture.grab():
+                        break
+
                 logger.success(f"Reconnected to {self.camera_id}")
                 self.error_count = 0
             else:
@@ -221,30 +338,58 @@ class RTSPCapture:
 
         logger.info(f"Capture stopped for {self.camera_id}")
 
-    def get_last_frame(self) -> Optional[tuple[np.ndarray, datetime]]:
+    @property
+    def last_frame_time(self) -> Optional[datetime]:
+        """Date de la dernière frame (None avant la première frame)"""
+        last_frame_ns = self._last_frame_ns
+        if last_frame_ns is None:
+            return None
+        return datetime.now() - timedelta(microseconds=(time.monotonic_ns() - last_frame_ns) / 1000)
+
+    @property
+    def last_frame(self) -> Optional[np.ndarray]:
+        """Buffer de la dernière frame publiée (None avant la première frame)"""
+        if self._buffers is None or self._last_frame_ns is None:
+            return None
+        return self._buffers[self._active]
+
+    def get_last_frame(self, copy: bool = True) -> Optional[tuple[np.ndarray, datetime]]:
         """
         Récupérer la dernière frame capturée
 
+        Args:
+            copy: Retourner une copie. Sans copie, une vue en lecture seule
+                est retournée: son buffer est réécrit par la capture deux
+                frames plus tard. Comparer `frame_generation` avant/après
+                lecture (écart >= 2) pour détecter une frame réécrite.
+
         Returns:
             Tuple (frame, timestamp) ou None
         """
-        if self.last_frame is not None and self.last_frame_time is not None:
-            return self.last_frame.copy(), self.last_frame_time
-        return None
+        with self._swap_lock:
+            frame = self.last_frame
+            if frame is None:
+                return None
+            return (frame.copy() if copy else _readonly_view(frame)), self.last_frame_time
 
     def get_stats(self) -> dict:
         """
         Récupérer les statistiques de capture
 
         Returns:
-            Dict avec les stats
+            Dict avec les stats (datetime et entiers bruts: la sérialisation
+            est laissée à ORJSONResponse)
         """
+        last_frame = self.last_frame
         return {
             "camera_id": self.camera_id,
             "is_running": self.is_running,
             "frame_count": self.frame_count,
             "error_count": self.error_count,
             "fps": self.actual_fps,
-            "last_frame_time": self.last_frame_time.isoformat() if self.last_frame_time else None,
-            "resolution": f"{self.last_frame.shape[1]}x{self.last_frame.shape[0]}" if self.last_frame is not None else None
+            "last_frame_time": self.last_frame_time,
+            "resolution": {
+                "width": last_frame.shape[1],
+                "height": last_frame.shape[0],
+            } if last_frame is not None else None
         }
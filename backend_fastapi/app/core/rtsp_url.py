@@ -0,0 +1,55 @@
+"""
+Manipulation des URLs RTSP (injection et extraction des credentials)
+"""
+from typing import Tuple
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+
+def _host_part(netloc: str) -> str:
+    """Partie hôte[:port] d'un netloc (sans les credentials éventuels)"""
+    return netloc.rpartition("@")[2]
+
+
+def build_authenticated_rtsp_url(url: str, username: str, password: str) -> str:
+    """
+    Injecte les credentials dans une URL RTSP
+
+    Username et mot de passe sont encodés (`@`, `:`, `/`... sont sûrs).
+    L'URL est renvoyée telle quelle si elle n'est pas RTSP, si elle contient
+    déjà des credentials ou si aucun credential n'est fourni.
+
+    Args:
+        url: URL RTSP sans credentials
+        username: Nom d'utilisateur
+        password: Mot de passe
+
+    Returns:
+        URL RTSP authentifiée
+    """
+    if not (username and password):
+        return url
+
+    parts = urlsplit(url)
+    if parts.scheme.lower() != "rtsp" or "@" in parts.netloc:
+        return url
+
+    netloc = f"{quote(username, safe='')}:{quote(password, safe='')}@{parts.netloc}"
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+def split_rtsp_credentials(url: str) -> Tuple[str, str, str]:
+    """
+    Sépare les credentials d'une URL RTSP
+
+    Args:
+        url: URL RTSP, avec ou sans credentials
+
+    Returns:
+        Tuple (username, password, clean_url), username/password décodés
+        et chaînes vides si absents
+    """
+    parts = urlsplit(url)
+    clean_url = urlunsplit((
+        parts.scheme, _host_part(parts.netloc), parts.path, parts.query, parts.fragment
+    ))
+    return unquote(parts.username or ""), unquote(parts.password or ""), clean_url
@@ -1,34 +1,47 @@
 """
 Module de sécurité pour JWT, hash de mots de passe et chiffrement de credentials
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Tuple
-from jose import JWTError, jwt
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple, Union
 import bcrypt
+import jwt
 from cryptography.fernet import Fernet
+import asyncio
 import base64
-import uuid
+import os
 import hashlib
+import secrets
 from loguru import logger
 
 from app.core.config import settings
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# Pool dédié au hachage bcrypt (CPU, libère le GIL) pour ne pas bloquer
+# la boucle asyncio ni saturer le pool par défaut
+_password_executor = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 2),
+    thread_name_prefix="password-hash",
+)
+
+
+def verify_password(plain_password: str, hashed_password: Union[str, bytes]) -> bool:
     """
     Vérifier si un mot de passe correspond au hash
 
     Args:
         plain_password: Mot de passe en clair
-        hashed_password: Hash bcrypt du mot de passe
+        hashed_password: Hash bcrypt du mot de passe (str, ou bytes déjà
+            encodés pour éviter une conversion)
 
     Returns:
         True si le mot de passe correspond
     """
-    # Convertir les strings en bytes pour bcrypt
-    password_bytes = plain_password.encode('utf-8')
-    hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+    # bcrypt travaille sur des bytes
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -43,11 +56,68 @@ def get_password_hash(password: str) -> str:
     """
     # Convertir en bytes et générer le hash
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Indiquer si un hash a été créé avec un coût inférieur à BCRYPT_ROUNDS
+
+    Migration uniquement vers un coût plus élevé: un hash plus coûteux que
+    la configuration est conservé (jamais d'affaiblissement silencieux).
+
+    Args:
+        hashed_password: Hash bcrypt ($2b$<coût>$...)
+
+    Returns:
+        True si le hash doit être recalculé
+    """
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds < settings.BCRYPT_ROUNDS
+
+
+async def verify_password_async(plain_password: str, hashed_password: Union[str, bytes]) -> bool:
+    """
+    Version asynchrone de verify_password, exécutée dans le pool dédié
+
+    Args:
+        plain_password: Mot de passe en clair
+        hashed_password: Hash bcrypt du mot de passe (str ou bytes)
+
+    Returns:
+        True si le mot de passe correspond
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _password_executor, verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Version asynchrone de get_password_hash, exécutée dans le pool dédié
+
+    Args:
+        password: Mot de passe en clair
+
+    Returns:
+        Hash bcrypt du mot de passe
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
+@lru_cache(maxsize=1)
+def _get_signing_key() -> bytes:
+    """Clé HMAC des JWT (encodée une seule fois)"""
+    return settings.SECRET_KEY.encode('utf-8')
+
+
 def create_access_token(
     data: Dict[str, Any],
     expires_delta: Optional[timedelta] = None
@@ -65,7 +135,7 @@ def create_access_token(
     to_encode = data.copy()
 
     # Générer un JTI unique (JWT ID) pour identifier ce token
-    jti = str(uuid.uuid4())
+    jti = secrets.token_hex(16)
 
     # Définir l'expiration
     if expires_delta:
@@ -83,7 +153,7 @@ def create_access_token(
     # Encoder le token
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.SECRET_KEY,
+        _get_signing_key(),
         algorithm=settings.ALGORITHM
     )
 
@@ -107,7 +177,7 @@ def create_refresh_token(
     to_encode = data.copy()
 
     # Générer un JTI unique
-    jti = str(uuid.uuid4())
+    jti = secrets.token_hex(16)
 
     # Refresh token a une durée de vie plus longue
     if expires_delta:
@@ -124,14 +194,14 @@ def create_refresh_token(
 
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.SECRET_KEY,
+        _get_signing_key(),
         algorithm=settings.ALGORITHM
     )
 
     return encoded_jwt, jti, expire
 
 
-def decode_token(token: str, check_blacklist: bool = True) -> Optional[Dict[str, Any]]:
+async def decode_token(token: str, check_blacklist: bool = True) -> Optional[Dict[str, Any]]:
     """
     Décoder et valider un token JWT
 
@@ -145,7 +215,7 @@ def decode_token(token: str, check_blacklist: bool = True) -> Optional[Dict[str,
     try:
         payload = jwt.decode(
             token,
-            settings.SECRET_KEY,
+            _get_signing_key(),
             algorithms=[settings.ALGORITHM]
         )
 
@@ -155,18 +225,18 @@ def decode_token(token: str, check_blacklist: bool = True) -> Optional[Dict[str,
             from app.core.token_blacklist import token_blacklist
 
             jti = payload.get("jti")
-            if jti and token_blacklist.is_blacklisted(jti):
+            if jti and await token_blacklist.is_blacklisted(jti):
                 logger.warning(f"Attempted use of blacklisted token: {jti[:8]}...")
                 return None
 
         return payload
 
-    except JWTError as e:
-        logger.debug(f"JWT decode error: {e}")
+    except jwt.PyJWTError as e:
+        logger.debug("JWT decode error: {}", e)
         return None
 
 
-def verify_token(token: str) -> bool:
+async def verify_token(token: str) -> bool:
     """
     Vérifier la validité d'un token JWT
 
@@ -176,11 +246,11 @@ def verify_token(token: str) -> bool:
     Returns:
         True si le token est valide
     """
-    payload = decode_token(token)
+    payload = await decode_token(token)
     return payload is not None
 
 
-def get_token_subject(token: str) -> Optional[str]:
+async def get_token_subject(token: str) -> Optional[str]:
     """
     Extraire le sujet (user_id) d'un token JWT
 
@@ -190,7 +260,7 @@ def get_token_subject(token: str) -> Optional[str]:
     Returns:
         User ID si le token est valide, None sinon
     """
-    payload = decode_token(token)
+    payload = await decode_token(token)
     if payload:
         return payload.get("sub")
     return None
@@ -200,25 +270,27 @@ def hash_token(token: str) -> str:
     """
     Hasher un token pour stockage sécurisé en base de données
 
-    Utilise SHA-256 pour hasher le token. Le hash peut être utilisé
-    pour vérifier qu'un token correspond sans stocker le token en clair.
+    Utilise BLAKE2b (256 bits, plus rapide que SHA-256 en logiciel). Le
+    hash peut être utilisé pour vérifier qu'un token correspond sans
+    stocker le token en clair.
 
     Args:
         token: Token JWT à hasher
 
     Returns:
-        Hash SHA-256 du token
+        Hash BLAKE2b-256 du token (64 caractères hexadécimaux)
     """
-    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=32).hexdigest()
 
 
 # ============================================
 # Chiffrement de credentials (pour caméras)
 # ============================================
 
+@lru_cache(maxsize=1)
 def _get_encryption_key() -> bytes:
     """
-    Génère ou récupère la clé de chiffrement depuis SECRET_KEY
+    Génère ou récupère la clé de chiffrement depuis SECRET_KEY (calculée une fois)
 
     Returns:
         Clé de chiffrement Fernet
@@ -230,6 +302,17 @@ def _get_encryption_key() -> bytes:
     return key
 
 
+@lru_cache(maxsize=1)
+def _get_fernet() -> Fernet:
+    """
+    Instance Fernet partagée (la clé ne change pas pendant l'exécution)
+
+    Returns:
+        Fernet initialisé avec la clé dérivée de SECRET_KEY
+    """
+    return Fernet(_get_encryption_key())
+
+
 def encrypt_credential(plain_text: str) -> str:
     """
     Chiffre un credential (username/password) pour stockage sécurisé
@@ -243,9 +326,7 @@ def encrypt_credential(plain_text: str) -> str:
     if not plain_text:
         return ""
 
-    key = _get_encryption_key()
-    fernet = Fernet(key)
-    encrypted = fernet.encrypt(plain_text.encode('utf-8'))
+    encrypted = _get_fernet().encrypt(plain_text.encode('utf-8'))
     return encrypted.decode('utf-8')
 
 
@@ -263,20 +344,9 @@ def decrypt_credential(encrypted_text: str) -> str:
         return ""
 
     try:
-        key = _get_encryption_key()
-        logger.debug(f"Decryption key (first 16 chars): {key[:16]}")
-        logger.debug(f"Encrypted text length: {len(encrypted_text)}")
-        logger.debug(f"Encrypted text (first 32 chars): {encrypted_text[:32]}")
-
-        fernet = Fernet(key)
-        decrypted = fernet.decrypt(encrypted_text.encode('utf-8'))
-        result = decrypted.decode('utf-8')
-
-        logger.debug(f"Decryption successful, result length: {len(result)}")
-        return result
-    except Exception as e:
-        logger.error(f"Decryption error: {e}")
-        logger.error(f"Encrypted text was: {encrypted_text[:50]}...")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        decrypted = _get_fernet().decrypt(encrypted_text.encode('utf-8'))
+        return decrypted.decode('utf-8')
+    except Exception:
+        # Ni la clé ni le texte chiffré ne sont journalisés
+        logger.exception("Credential decryption failed")
         return ""
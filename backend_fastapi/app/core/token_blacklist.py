@@ -1,12 +1,36 @@
 """
 Système de blacklist pour tokens JWT révoqués
 
-Utilise un dict en mémoire pour stocker les tokens blacklistés.
-Pour une solution production, utiliser Redis.
+Deux backends avec la même interface async:
+- TokenBlacklist: dict en mémoire (développement, un seul worker)
+- RedisTokenBlacklist: clés Redis avec TTL, partagées entre workers/instances
+
+Le backend est choisi selon REDIS_URL.
 """
-from datetime import datetime
-from typing import Set, Dict
+from datetime import datetime, timezone
+from typing import Set, Dict, List, Optional, Iterable, Tuple
 from loguru import logger
+import asyncio
+import heapq
+import time
+
+from app.core.config import settings
+from app.core.bloom_filter import RotatingTokenFilter
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Normaliser une date en UTC aware (les dates naïves sont supposées UTC)"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _max_token_lifetime_seconds() -> float:
+    """Durée de vie maximale d'un token (access ou refresh) en secondes"""
+    return max(
+        settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+    )
 
 
 class TokenBlacklist:
@@ -17,6 +41,10 @@ class TokenBlacklist:
     la persistance et le partage entre instances.
     """
 
+    # Intervalle minimal entre deux nettoyages déclenchés par is_blacklisted
+    # (un token expiré encore présent est de toute façon refusé par son exp)
+    CLEANUP_INTERVAL_SECONDS = 30.0
+
     def __init__(self):
         # Set de JTI (JWT ID) blacklistés
         self._blacklisted_jtis: Set[str] = set()
@@ -24,21 +52,61 @@ class TokenBlacklist:
         # Dict pour stocker l'expiration des tokens (nettoyage automatique)
         self._jti_expiration: Dict[str, datetime] = {}
 
+        # Tas (expiration, jti): le nettoyage ne dépile que les tokens expirés
+        # au lieu de parcourir toute la blacklist. Les entrées périmées
+        # (token retiré ou ré-enregistré) sont ignorées au dépilement.
+        self._exp_heap: List[Tuple[datetime, str]] = []
+        self._max_expiration: Optional[datetime] = None
+        self._last_cleanup = 0.0
+
         logger.info("TokenBlacklist initialized (in-memory)")
 
-    def blacklist_token(self, jti: str, expires_at: datetime):
+    async def connect(self) -> None:
+        """Rien à initialiser pour le backend mémoire"""
+
+    async def close(self) -> None:
+        """Rien à libérer pour le backend mémoire"""
+
+    async def blacklist_token(self, jti: str, expires_at: datetime):
         """
         Ajouter un token à la blacklist
 
         Args:
             jti: JWT ID (unique identifier du token)
-            expires_at: Date d'expiration du token
+            expires_at: Date d'expiration du token (naïve = UTC)
         """
+        expires_at = _as_utc(expires_at)
         self._blacklisted_jtis.add(jti)
         self._jti_expiration[jti] = expires_at
+        self._push_expiration(jti, expires_at)
         logger.info(f"Token {jti[:8]}... blacklisted until {expires_at}")
 
-    def is_blacklisted(self, jti: str) -> bool:
+    async def blacklist_many(self, items: Iterable[Tuple[str, datetime]]) -> int:
+        """
+        Ajouter plusieurs tokens à la blacklist en une opération
+
+        Args:
+            items: Couples (jti, date d'expiration)
+
+        Returns:
+            Nombre de tokens blacklistés
+        """
+        expirations = {jti: _as_utc(expires_at) for jti, expires_at in items}
+        self._blacklisted_jtis.update(expirations)
+        self._jti_expiration.update(expirations)
+        for jti, expires_at in expirations.items():
+            self._push_expiration(jti, expires_at)
+
+        if expirations:
+            logger.info(f"{len(expirations)} tokens blacklisted")
+        return len(expirations)
+
+    def _push_expiration(self, jti: str, expires_at: datetime):
+        heapq.heappush(self._exp_heap, (expires_at, jti))
+        if self._max_expiration is None or expires_at > self._max_expiration:
+            self._max_expiration = expires_at
+
+    async def is_blacklisted(self, jti: str) -> bool:
         """
         Vérifier si un token est blacklisté
 
@@ -48,12 +116,15 @@ class TokenBlacklist:
         Returns:
             True si le token est blacklisté
         """
-        # Nettoyer les tokens expirés
-        self._cleanup_expired()
+        # Nettoyer les tokens expirés (au plus une fois par intervalle)
+        now = time.monotonic()
+        if now - self._last_cleanup > self.CLEANUP_INTERVAL_SECONDS:
+            self._last_cleanup = now
+            self._cleanup_expired()
 
         return jti in self._blacklisted_jtis
 
-    def remove_from_blacklist(self, jti: str):
+    async def remove_from_blacklist(self, jti: str):
         """
         Retirer un token de la blacklist (rarement utilisé)
 
@@ -62,7 +133,10 @@ class TokenBlacklist:
         """
         if jti in self._blacklisted_jtis:
             self._blacklisted_jtis.discard(jti)
-            self._jti_expiration.pop(jti, None)
+            expires_at = self._jti_expiration.pop(jti, None)
+            # L'entrée du tas devient périmée; seul le max doit être recalculé
+            if expires_at == self._max_expiration:
+                self._max_expiration = max(self._jti_expiration.values(), default=None)
             logger.info(f"Token {jti[:8]}... removed from blacklist")
 
     def _cleanup_expired(self):
@@ -72,20 +146,36 @@ class TokenBlacklist:
         Les tokens expirés ne sont plus valides même s'ils ne sont pas
         blacklistés, donc on peut les retirer pour économiser de la mémoire.
         """
-        now = datetime.utcnow()
-        expired_jtis = [
-            jti for jti, exp_date in self._jti_expiration.items()
-            if exp_date < now
-        ]
+        heap = self._exp_heap
+        if not heap:
+            return
 
-        for jti in expired_jtis:
-            self._blacklisted_jtis.discard(jti)
-            self._jti_expiration.pop(jti, None)
+        now = datetime.now(timezone.utc)
+        cleaned = 0
+        while heap and heap[0][0] < now:
+            exp_date, jti = heapq.heappop(heap)
+            # Entrée périmée: token retiré ou ré-enregistré avec une autre expiration
+            if self._jti_expiration.get(jti) == exp_date:
+                self._blacklisted_jtis.discard(jti)
+                del self._jti_expiration[jti]
+                cleaned += 1
 
-        if expired_jtis:
-            logger.debug(f"Cleaned up {len(expired_jtis)} expired tokens from blacklist")
+        if not self._jti_expiration:
+            # Blacklist vide: repartir d'un tas propre
+            heap.clear()
+            self._max_expiration = None
 
-    def get_stats(self) -> dict:
+        if cleaned:
+            logger.debug(f"Cleaned up {cleaned} expired tokens from blacklist")
+
+    def _oldest_expiration(self) -> Optional[datetime]:
+        """Plus proche expiration (sommet du tas, entrées périmées écartées)"""
+        heap = self._exp_heap
+        while heap and self._jti_expiration.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    async def get_stats(self) -> dict:
         """
         Obtenir des statistiques sur la blacklist
 
@@ -94,11 +184,234 @@ class TokenBlacklist:
         """
         self._cleanup_expired()
         return {
+            "backend": "memory",
             "blacklisted_count": len(self._blacklisted_jtis),
-            "oldest_expiration": min(self._jti_expiration.values()) if self._jti_expiration else None,
-            "newest_expiration": max(self._jti_expiration.values()) if self._jti_expiration else None,
+            "oldest_expiration": self._oldest_expiration(),
+            "newest_expiration": self._max_expiration if self._jti_expiration else None,
+        }
+
+
+class RedisTokenBlacklist:
+    """
+    Blacklist partagée stockée dans Redis
+
+    Chaque token révoqué est une clé `bl:{jti}` qui expire (EXAT) à la date
+    d'expiration du token: Redis la supprime automatiquement, aucun
+    nettoyage n'est nécessaire.
+
+    Un filtre local (RotatingTokenFilter) évite l'aller-retour Redis pour les
+    tokens jamais révoqués. Il est alimenté par un scan initial des clés puis
+    par pub/sub (révocations faites par les autres workers); tant que cette
+    synchronisation n'est pas active, toutes les vérifications vont à Redis.
+    Ses deux générations tournent à la durée de vie maximale d'un token: les
+    révocations expirées en sortent sans qu'il grossisse indéfiniment.
+    """
+
+    KEY_PREFIX = "bl:"
+    CHANNEL = "bl:revoked"
+
+    def __init__(self, url: str):
+        # Import ici: redis n'est requis que si REDIS_URL est configuré
+        from redis import asyncio as redis_asyncio
+
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self._url = url
+
+        self._filter = RotatingTokenFilter(period_seconds=_max_token_lifetime_seconds())
+        self._filter_ready = False
+        self._sync_task: Optional[asyncio.Task] = None
+
+        logger.info("TokenBlacklist initialized (redis)")
+
+    def _key(self, jti: str) -> str:
+        return f"{self.KEY_PREFIX}{jti}"
+
+    @staticmethod
+    def _expire_at(expires_at: datetime) -> int:
+        """
+        Timestamp Unix pour EXAT: expiration absolue, sans calcul de TTL
+        relatif à l'horloge locale (même arrondi que le claim exp du JWT)
+        """
+        return int(expires_at.timestamp())
+
+    async def connect(self) -> None:
+        """Vérifier la connexion Redis et lancer la synchronisation du filtre"""
+        try:
+            await self._redis.ping()
+            logger.success("TokenBlacklist connected to Redis")
+        except Exception as e:
+            logger.error(f"TokenBlacklist Redis connection failed: {e}")
+
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_filter())
+
+    async def close(self) -> None:
+        """Arrêter la synchronisation et fermer la connexion Redis"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+        await self._redis.aclose()
+
+    async def _sync_filter(self) -> None:
+        """
+        Maintenir le filtre local à jour (tâche de fond)
+
+        S'abonne au canal avant de scanner les clés existantes pour ne manquer
+        aucune révocation; en cas d'erreur le filtre est désactivé puis
+        reconstruit.
+        """
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+
+                self._filter.clear()
+                async for key in self._redis.scan_iter(match=f"{self.KEY_PREFIX}*", count=1000):
+                    self._filter.add(key[len(self.KEY_PREFIX):])
+
+                self._filter_ready = True
+                logger.info(f"TokenBlacklist filter synced ({len(self._filter)} revoked tokens)")
+
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._filter.add(message["data"])
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"TokenBlacklist filter sync interrupted: {e}")
+            finally:
+                self._filter_ready = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+            await asyncio.sleep(1)
+
+    async def blacklist_token(self, jti: str, expires_at: datetime):
+        """
+        Ajouter un token à la blacklist
+
+        Args:
+            jti: JWT ID (unique identifier du token)
+            expires_at: Date d'expiration du token (naïve = UTC)
+        """
+        expires_at = _as_utc(expires_at)
+        if expires_at <= datetime.now(timezone.utc):
+            # Token déjà expiré, il sera refusé de toute façon
+            return
+
+        # Stocker puis notifier les autres workers (mise à jour de leur filtre)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(jti), "1", exat=self._expire_at(expires_at))
+            pipe.publish(self.CHANNEL, jti)
+            await pipe.execute()
+
+        self._filter.add(jti)
+        logger.info(f"Token {jti[:8]}... blacklisted until {expires_at}")
+
+    async def blacklist_many(self, items: Iterable[Tuple[str, datetime]]) -> int:
+        """
+        Ajouter plusieurs tokens à la blacklist en un seul aller-retour Redis
+
+        Args:
+            items: Couples (jti, date d'expiration)
+
+        Returns:
+            Nombre de tokens blacklistés (hors tokens déjà expirés)
+        """
+        now = datetime.now(timezone.utc)
+        jtis = []
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for jti, expires_at in items:
+                expires_at = _as_utc(expires_at)
+                if expires_at <= now:
+                    continue
+                pipe.set(self._key(jti), "1", exat=self._expire_at(expires_at))
+                pipe.publish(self.CHANNEL, jti)
+                jtis.append(jti)
+
+            if jtis:
+                await pipe.execute()
+
+        for jti in jtis:
+            self._filter.add(jti)
+
+        if jtis:
+            logger.info(f"{len(jtis)} tokens blacklisted")
+        return len(jtis)
+
+    async def is_blacklisted(self, jti: str) -> bool:
+        """
+        Vérifier si un token est blacklisté
+
+        Args:
+            jti: JWT ID à vérifier
+
+        Returns:
+            True si le token est blacklisté
+        """
+        # Absent du filtre synchronisé: certainement pas révoqué, pas d'appel Redis
+        if self._filter_ready and not self._filter.might_contain(jti):
+            return False
+
+        return bool(await self._redis.exists(self._key(jti)))
+
+    async def remove_from_blacklist(self, jti: str):
+        """
+        Retirer un token de la blacklist (rarement utilisé)
+
+        Args:
+            jti: JWT ID à retirer
+        """
+        if await self._redis.delete(self._key(jti)):
+            logger.info(f"Token {jti[:8]}... removed from blacklist")
+
+    async def get_stats(self) -> dict:
+        """
+        Obtenir des statistiques sur la blacklist
+
+        Aucun SCAN Redis (coût proportionnel au nombre de révocations, sur un
+        endpoint accessible à tout utilisateur): le nombre est celui vu par
+        le filtre local de ce worker, une estimation.
+
+        Returns:
+            Dict avec le nombre (estimé) de tokens blacklistés
+        """
+        return {
+            "backend": "redis",
+            "blacklisted_count": len(self._filter),
+            "local_filter": {
+                "ready": self._filter_ready,
+                "mode": "bloom" if self._filter.is_bloom else "set",
+                "size": len(self._filter),
+            },
         }
 
 
+def create_token_blacklist():
+    """
+    Créer la blacklist selon la configuration
+
+    Returns:
+        RedisTokenBlacklist si REDIS_URL est défini (et redis installé),
+        TokenBlacklist en mémoire sinon
+    """
+    if settings.REDIS_URL:
+        try:
+            return RedisTokenBlacklist(settings.REDIS_URL)
+        except ImportError:
+            logger.warning("REDIS_URL is set but redis is not installed, using in-memory blacklist")
+
+    return TokenBlacklist()
+
+
 # Instance globale (singleton)
-token_blacklist = TokenBlacklist()
+token_blacklist = create_token_blacklist()
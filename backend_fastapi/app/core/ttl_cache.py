@@ -0,0 +1,110 @@
+"""
+Cache mémoire avec expiration (TTL) et éviction LRU
+
+Prévu pour être utilisé depuis la boucle asyncio (pas de verrou).
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache clé/valeur borné en taille avec expiration par entrée
+
+    Les entrées les moins récemment utilisées sont évincées quand
+    `max_size` est atteint. Les entrées expirées sont retirées à la lecture,
+    sauf pendant la période de grâce `stale_ttl_seconds` où elles restent
+    accessibles via `get_stale` (stale-if-error).
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 60.0,
+        stale_ttl_seconds: float = 0.0
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        # clé -> (expiration monotonic, valeur)
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Récupérer une valeur si présente et non expirée
+
+        Args:
+            key: Clé de l'entrée
+            default: Valeur retournée si absente ou expirée
+
+        Returns:
+            Valeur en cache ou `default`
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl_seconds <= now:
+                del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Récupérer une valeur même expirée, tant qu'elle est dans la période de grâce
+
+        À utiliser en repli quand la source de données est indisponible.
+
+        Args:
+            key: Clé de l'entrée
+            default: Valeur retournée si absente
+
+        Returns:
+            Valeur en cache (éventuellement périmée) ou `default`
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at + self.stale_ttl_seconds <= time.monotonic():
+            del self._entries[key]
+            return default
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Ajouter ou remplacer une entrée
+
+        Args:
+            key: Clé de l'entrée
+            value: Valeur à stocker
+            ttl: Durée de vie en secondes (défaut: ttl_seconds du cache)
+        """
+        ttl = self.ttl_seconds if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Retirer une entrée (sans erreur si absente)"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Vider le cache"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,120 +1,236 @@
 """
 Client ClickHouse async pour les événements time-series
 """
+import asyncio
 import clickhouse_connect
-from typing import List, Dict, Any, Optional
+import orjson
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from loguru import logger
 
 from app.core.config import settings
+from app.core.ttl_cache import TTLCache
+
+
+# Colonnes écrites par insert_event (ordre des valeurs de chaque ligne)
+_EVENT_COLUMNS = (
+    "id", "timestamp", "camera_id", "event_type", "severity",
+    "description", "metadata", "frame_url", "video_url",
+)
 
 
 class ClickHouseClient:
     """
     Client ClickHouse pour gérer les événements
     Utilise clickhouse-connect (plus stable que aioclickhouse)
+
+    clickhouse-connect est synchrone: chaque appel réseau est exécuté dans
+    un thread (asyncio.to_thread) pour ne pas bloquer la boucle asyncio.
+
+    Les insertions sont regroupées: chaque INSERT crée une part MergeTree,
+    les événements sont donc bufferisés et écrits par lots (taille ou délai).
+    Un lot en échec est remis en tête du buffer pour la prochaine écriture;
+    au-delà de INSERT_BUFFER_MAX événements, les plus anciens sont abandonnés.
     """
 
+    # Taille max d'un lot et délai max avant écriture (secondes)
+    INSERT_BATCH_SIZE = 500
+    INSERT_FLUSH_INTERVAL = 1.0
+    # Événements gardés au plus en mémoire pendant une indisponibilité
+    INSERT_BUFFER_MAX = 10 * INSERT_BATCH_SIZE
+
     def __init__(self):
         self.client = None
         self._initialized = False
+        self._insert_buffer: List[tuple] = []
+        self._flush_lock = asyncio.Lock()
+        # Dernier INSERT en échec: les reprises sont laissées au flush périodique
+        self._flush_failed = False
+        self._flusher_task: Optional[asyncio.Task] = None
+        # Stats globales (dashboard interrogé en boucle): une requête par TTL
+        self._stats_cache = TTLCache(max_size=1, ttl_seconds=settings.EVENT_STATS_CACHE_TTL_SECONDS)
+
+    @property
+    def is_connected(self) -> bool:
+        """Indique si la connexion ClickHouse est initialisée"""
+        return self._initialized
 
     async def connect(self) -> None:
         """Initialiser la connexion ClickHouse"""
         try:
-            # clickhouse-connect est synchrone mais très rapide
-            self.client = clickhouse_connect.get_client(
+            # Sans session HTTP: ClickHouse refuse les requêtes concurrentes
+            # dans une même session, or elles partent de plusieurs threads
+            self.client = await asyncio.to_thread(
+                clickhouse_connect.get_client,
                 host=settings.CLICKHOUSE_HOST,
                 port=settings.CLICKHOUSE_PORT,
                 username=settings.CLICKHOUSE_USER,
                 password=settings.CLICKHOUSE_PASSWORD,
                 database=settings.CLICKHOUSE_DATABASE,
+                autogenerate_session_id=False,
             )
 
             # Tester la connexion
-            self.client.query("SELECT 1")
+            await asyncio.to_thread(self.client.query, "SELECT 1")
             self._initialized = True
-            print(f"OK ClickHouse connected: {settings.CLICKHOUSE_HOST}:{settings.CLICKHOUSE_PORT}")
+            logger.info("ClickHouse connected: {}:{}", settings.CLICKHOUSE_HOST, settings.CLICKHOUSE_PORT)
 
             # Créer les tables si elles n'existent pas
             await self._create_tables()
 
+            # Écriture périodique des événements bufferisés
+            if self._flusher_task is None:
+                self._flusher_task = asyncio.create_task(self._flusher_loop())
+
         except Exception as e:
-            print(f"ERROR: ClickHouse connection failed: {e}")
+            logger.error("ClickHouse connection failed: {}", e)
             self._initialized = False
 
     async def _create_tables(self) -> None:
-        """Créer les tables events si elles n'existent pas"""
+        """
+        Créer les tables events si elles n'existent pas
+
+        camera_id, event_type et severity ne prennent que quelques dizaines de
+        valeurs: LowCardinality les stocke sous forme de dictionnaire (colonnes
+        plus petites, filtres et GROUP BY sur des codes entiers).
+
+        acknowledged ne fait pas partie de la clé de tri: l'index de saut
+        set(2) permet d'écarter les granules entièrement acquittés lors d'un
+        filtre acknowledged = 0 (liste des événements non acquittés).
+        """
         create_events_table = """
         CREATE TABLE IF NOT EXISTS events (
             id String,
             timestamp DateTime,
-            camera_id String,
-            event_type String,
-            severity String,
+            camera_id LowCardinality(String),
+            event_type LowCardinality(String),
+            severity LowCardinality(String),
             description String,
             acknowledged UInt8 DEFAULT 0,
             acknowledged_by String DEFAULT '',
             acknowledged_at Nullable(DateTime),
             metadata String DEFAULT '{}',
             frame_url String DEFAULT '',
-            video_url String DEFAULT ''
+            video_url String DEFAULT '',
+            INDEX idx_ack acknowledged TYPE set(2) GRANULARITY 4
         ) ENGINE = MergeTree()
         ORDER BY (timestamp, camera_id)
         PARTITION BY toYYYYMM(timestamp)
         TTL timestamp + INTERVAL 90 DAY
         """
-        self.client.command(create_events_table)
-        print("OK ClickHouse events table created/verified")
+        await asyncio.to_thread(self.client.command, create_events_table)
+        # Tables créées avant l'index: l'ajouter (les nouvelles parts l'utilisent)
+        await asyncio.to_thread(
+            self.client.command,
+            "ALTER TABLE events ADD INDEX IF NOT EXISTS idx_ack acknowledged TYPE set(2) GRANULARITY 4"
+        )
+        logger.info("ClickHouse events table created/verified")
 
     async def disconnect(self) -> None:
-        """Fermer la connexion ClickHouse"""
+        """Fermer la connexion ClickHouse (après écriture du buffer)"""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+
         if self.client:
-            self.client.close()
+            await self.flush()
+            await asyncio.to_thread(self.client.close)
             self._initialized = False
-            print("OK ClickHouse connection closed")
+            logger.info("ClickHouse connection closed")
 
-    async def insert_event(self, event: Dict[str, Any]) -> bool:
+    async def insert_event(
+        self,
+        event: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
         """
         Insérer un nouvel événement
 
+        L'événement est ajouté au buffer d'insertion, écrit dès que le lot
+        atteint INSERT_BATCH_SIZE ou au plus tard après INSERT_FLUSH_INTERVAL.
+
+        Les métadonnées sont passées en dict et sérialisées ici (orjson);
+        une chaîne JSON déjà sérialisée reste acceptée.
+
         Args:
             event: Dictionnaire contenant les données de l'événement
+            metadata: Métadonnées de l'événement (défaut: event["metadata"])
 
         Returns:
-            True si l'insertion a réussi
+            True si l'événement a été accepté
         """
         if not self._initialized:
-            print("⚠️ ClickHouse not initialized, skipping event insert")
+            logger.debug("ClickHouse not initialized, skipping event insert")
             return False
 
-        try:
-            data = [
-                [
-                    event.get("id"),
-                    event.get("timestamp", datetime.utcnow()),
-                    event.get("camera_id"),
-                    event.get("event_type"),
-                    event.get("severity", "medium"),
-                    event.get("description", ""),
-                    event.get("metadata", "{}"),
-                    event.get("frame_url", ""),
-                    event.get("video_url", ""),
-                ]
-            ]
-
-            self.client.insert(
-                table="events",
-                data=data,
-                column_names=[
-                    "id", "timestamp", "camera_id", "event_type", "severity",
-                    "description", "metadata", "frame_url", "video_url"
-                ]
-            )
-            return True
+        if metadata is None:
+            metadata = event.get("metadata")
+        if not isinstance(metadata, str):
+            metadata = orjson.dumps(metadata or {}).decode()
+
+        self._insert_buffer.append((
+            event.get("id"),
+            event.get("timestamp", datetime.utcnow()),
+            event.get("camera_id"),
+            event.get("event_type"),
+            event.get("severity", "medium"),
+            event.get("description", ""),
+            metadata,
+            event.get("frame_url", ""),
+            event.get("video_url", ""),
+        ))
+
+        if len(self._insert_buffer) >= self.INSERT_BATCH_SIZE and not self._flush_failed:
+            await self.flush()
+        return True
+
+    async def flush(self) -> int:
+        """
+        Écrire les événements bufferisés en un seul INSERT
 
-        except Exception as e:
-            print(f"❌ Error inserting event to ClickHouse: {e}")
-            return False
+        Returns:
+            Nombre d'événements écrits
+        """
+        async with self._flush_lock:
+            batch, self._insert_buffer = self._insert_buffer, []
+            if not batch:
+                return 0
+
+            try:
+                await asyncio.to_thread(
+                    self.client.insert,
+                    table="events",
+                    data=batch,
+                    column_names=_EVENT_COLUMNS
+                )
+                self._flush_failed = False
+                return len(batch)
+
+            except Exception as e:
+                logger.error("Error inserting {} events to ClickHouse: {}", len(batch), e)
+                self._flush_failed = True
+                self._requeue(batch)
+                return 0
+
+    def _requeue(self, batch: List[tuple]) -> None:
+        """Remettre un lot non écrit en tête du buffer (borné à INSERT_BUFFER_MAX)"""
+        buffer = batch + self._insert_buffer
+        dropped = len(buffer) - self.INSERT_BUFFER_MAX
+        if dropped > 0:
+            # Les événements les plus anciens sont abandonnés
+            del buffer[:dropped]
+            logger.warning("ClickHouse insert buffer full, dropped {} oldest events", dropped)
+        self._insert_buffer = buffer
+
+    async def _flusher_loop(self) -> None:
+        """Écrire le buffer toutes les INSERT_FLUSH_INTERVAL secondes"""
+        while True:
+            await asyncio.sleep(self.INSERT_FLUSH_INTERVAL)
+            await self.flush()
 
     async def get_events(
         self,
@@ -124,39 +240,56 @@ class ClickHouseClient:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         acknowledged: Optional[bool] = None,
+        before: Optional[Tuple[datetime, str]] = None,
         limit: int = 50,
         offset: int = 0,
     ) -> List[Dict[str, Any]]:
         """
         Récupérer les événements avec filtres
 
+        Les filtres et la pagination sont appliqués côté ClickHouse
+        (WHERE / LIMIT / OFFSET), seule la page demandée est transférée.
+        `before` active la pagination par curseur sur (timestamp, id).
+
         Returns:
-            Liste d'événements
+            Liste d'événements (un dict par ligne)
         """
         if not self._initialized:
             return []
 
         try:
-            # Construire la requête avec filtres
+            # Construire la requête avec filtres: valeurs liées côté serveur
+            # ({nom:Type}), jamais interpolées dans le SQL
             conditions = []
+            params: Dict[str, Any] = {"limit": limit, "offset": offset}
 
             if camera_id:
-                conditions.append(f"camera_id = '{camera_id}'")
+                conditions.append("camera_id = {camera_id:String}")
+                params["camera_id"] = camera_id
 
             if event_type:
-                conditions.append(f"event_type = '{event_type}'")
+                conditions.append("event_type = {event_type:String}")
+                params["event_type"] = event_type
 
             if severity:
-                conditions.append(f"severity = '{severity}'")
+                conditions.append("severity = {severity:String}")
+                params["severity"] = severity
 
             if start_date:
-                conditions.append(f"timestamp >= '{start_date.isoformat()}'")
+                conditions.append("timestamp >= {start_date:DateTime}")
+                params["start_date"] = start_date
 
             if end_date:
-                conditions.append(f"timestamp <= '{end_date.isoformat()}'")
+                conditions.append("timestamp <= {end_date:DateTime}")
+                params["end_date"] = end_date
 
             if acknowledged is not None:
-                conditions.append(f"acknowledged = {1 if acknowledged else 0}")
+                conditions.append("acknowledged = {acknowledged:UInt8}")
+                params["acknowledged"] = 1 if acknowledged else 0
+
+            if before:
+                conditions.append("(timestamp, id) < ({before_ts:DateTime}, {before_id:String})")
+                params["before_ts"], params["before_id"] = before
 
             where_clause = " AND ".join(conditions) if conditions else "1=1"
 
@@ -164,69 +297,60 @@ class ClickHouseClient:
             SELECT *
             FROM events
             WHERE {where_clause}
-            ORDER BY timestamp DESC
-            LIMIT {limit} OFFSET {offset}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT {{limit:UInt32}} OFFSET {{offset:UInt32}}
             """
 
-            result = self.client.query(query)
-            return result.result_rows
+            result = await asyncio.to_thread(self.client.query, query, parameters=params)
+            return list(result.named_results())
 
         except Exception as e:
-            print(f"❌ Error querying events from ClickHouse: {e}")
+            logger.error("Error querying events from ClickHouse: {}", e)
             return []
 
     async def get_event_stats(self) -> Dict[str, Any]:
         """
         Récupérer les statistiques globales des événements
 
+        Le résultat est gardé en cache EVENT_STATS_CACHE_TTL_SECONDS: les
+        sondages du dashboard dans cet intervalle ne relisent pas la table.
+
         Returns:
             Dictionnaire avec les stats
         """
         if not self._initialized:
             return {}
 
-        try:
-            # Total events
-            total_result = self.client.query("SELECT count() as total FROM events")
-            total_events = total_result.result_rows[0][0] if total_result.result_rows else 0
-
-            # Events aujourd'hui
-            today_result = self.client.query("""
-                SELECT count() as today
-                FROM events
-                WHERE toDate(timestamp) = today()
-            """)
-            events_today = today_result.result_rows[0][0] if today_result.result_rows else 0
-
-            # Events 7 derniers jours
-            week_result = self.client.query("""
-                SELECT count() as week
-                FROM events
-                WHERE timestamp >= now() - INTERVAL 7 DAY
-            """)
-            events_last_7_days = week_result.result_rows[0][0] if week_result.result_rows else 0
+        cached = self._stats_cache.get("stats")
+        if cached is not None:
+            return cached
 
-            # Events par type
-            type_result = self.client.query("""
-                SELECT event_type, count() as count
-                FROM events
-                GROUP BY event_type
-            """)
-            events_by_type = {row[0]: row[1] for row in type_result.result_rows}
-
-            # Events par sévérité
-            severity_result = self.client.query("""
-                SELECT severity, count() as count
+        try:
+            # Tous les agrégats en un seul parcours de la table (une requête):
+            # compteurs conditionnels + répartitions par type/sévérité (sumMap)
+            result = await asyncio.to_thread(self.client.query, """
+                SELECT
+                    count() AS total,
+                    countIf(toDate(timestamp) = today()) AS today,
+                    countIf(timestamp >= now() - INTERVAL 7 DAY) AS week,
+                    countIf(acknowledged = 0) AS unack,
+                    sumMap([event_type], [toUInt64(1)]) AS by_type,
+                    sumMap([severity], [toUInt64(1)]) AS by_severity
                 FROM events
-                GROUP BY severity
             """)
-            events_by_severity = {row[0]: row[1] for row in severity_result.result_rows}
-
-            # Non acquittés
-            unack_result = self.client.query("SELECT count() as unack FROM events WHERE acknowledged = 0")
-            unacknowledged_count = unack_result.result_rows[0][0] if unack_result.result_rows else 0
-
-            return {
+            (
+                total_events,
+                events_today,
+                events_last_7_days,
+                unacknowledged_count,
+                (type_keys, type_counts),
+                (severity_keys, severity_counts),
+            ) = result.result_rows[0]
+
+            events_by_type = dict(zip(type_keys, type_counts))
+            events_by_severity = dict(zip(severity_keys, severity_counts))
+
+            stats = {
                 "total_events": total_events,
                 "events_today": events_today,
                 "events_last_7_days": events_last_7_days,
@@ -234,9 +358,11 @@ class ClickHouseClient:
                 "events_by_severity": events_by_severity,
                 "unacknowledged_count": unacknowledged_count,
             }
+            self._stats_cache.set("stats", stats)
+            return stats
 
         except Exception as e:
-            print(f"❌ Error getting event stats from ClickHouse: {e}")
+            logger.error("Error getting event stats from ClickHouse: {}", e)
             return {}
 
 
@@ -2,10 +2,13 @@
 Client MinIO async pour le stockage des médias (frames, vidéos)
 """
 from aiobotocore.session import get_session
+import botocore.session
 from botocore.exceptions import ClientError
+from contextlib import AsyncExitStack
 from typing import Optional, BinaryIO
 import aiofiles
 from io import BytesIO
+from loguru import logger
 
 from app.core.config import settings
 
@@ -14,47 +17,70 @@ class MinIOStorage:
     """
     Client MinIO async pour gérer le stockage des médias
     Compatible S3
+
+    Le client aiobotocore est ouvert une seule fois dans connect() et
+    réutilisé par toutes les opérations (pool de connexions HTTP et
+    keep-alive conservés), puis fermé dans disconnect().
+
+    Les URL pré-signées sont un simple calcul HMAC local: elles passent par
+    un client botocore synchrone (sans pool HTTP) plutôt que par le client
+    async.
     """
 
+    # Taille des parts d'upload multipart et des blocs de téléchargement:
+    # mémoire bornée quelle que soit la taille du fichier (min S3: 5 Mo)
+    CHUNK_SIZE = 8 * 1024 * 1024
+
     def __init__(self):
         self.session = get_session()
         self.client = None
+        self._presign_client = None
+        self._exit_stack: Optional[AsyncExitStack] = None
         self._initialized = False
 
     async def connect(self) -> None:
         """Initialiser la connexion MinIO"""
         try:
-            # Créer le client S3 (compatible MinIO)
-            self.client = self.session.create_client(
-                "s3",
-                endpoint_url=f"{'https' if settings.MINIO_SECURE else 'http'}://{settings.MINIO_ENDPOINT}",
-                aws_access_key_id=settings.MINIO_ACCESS_KEY,
-                aws_secret_access_key=settings.MINIO_SECRET_KEY,
+            client_options = {
+                "endpoint_url": f"{'https' if settings.MINIO_SECURE else 'http'}://{settings.MINIO_ENDPOINT}",
+                "aws_access_key_id": settings.MINIO_ACCESS_KEY,
+                "aws_secret_access_key": settings.MINIO_SECRET_KEY,
+            }
+
+            # Créer le client S3 (compatible MinIO), ouvert pour toute la durée de vie
+            self._exit_stack = AsyncExitStack()
+            self.client = await self._exit_stack.enter_async_context(
+                self.session.create_client("s3", **client_options)
             )
+            # Client synchrone pour la pré-signature (aucun appel réseau)
+            self._presign_client = botocore.session.get_session().create_client("s3", **client_options)
 
             # Vérifier si le bucket existe, le créer sinon
-            async with self.client as client:
-                try:
-                    await client.head_bucket(Bucket=settings.MINIO_BUCKET)
-                    print(f"OK MinIO bucket exists: {settings.MINIO_BUCKET}")
-                except ClientError:
-                    # Le bucket n'existe pas, le créer
-                    await client.create_bucket(Bucket=settings.MINIO_BUCKET)
-                    print(f"OK MinIO bucket created: {settings.MINIO_BUCKET}")
+            try:
+                await self.client.head_bucket(Bucket=settings.MINIO_BUCKET)
+                logger.info("MinIO bucket exists: {}", settings.MINIO_BUCKET)
+            except ClientError:
+                # Le bucket n'existe pas, le créer
+                await self.client.create_bucket(Bucket=settings.MINIO_BUCKET)
+                logger.info("MinIO bucket created: {}", settings.MINIO_BUCKET)
 
             self._initialized = True
-            print(f"OK MinIO connected: {settings.MINIO_ENDPOINT}")
+            logger.info("MinIO connected: {}", settings.MINIO_ENDPOINT)
 
         except Exception as e:
-            print(f"❌ MinIO connection failed: {e}")
+            logger.error("MinIO connection failed: {}", e)
             self._initialized = False
+            await self.disconnect()
 
     async def disconnect(self) -> None:
         """Fermer la connexion MinIO"""
-        if self.client:
-            await self.client.__aexit__(None, None, None)
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self.client = None
+            self._presign_client = None
             self._initialized = False
-            print("OK MinIO connection closed")
+            logger.info("MinIO connection closed")
 
     async def upload_file(
         self,
@@ -65,6 +91,9 @@ class MinIOStorage:
         """
         Upload un fichier depuis le disque vers MinIO
 
+        Lu par blocs de CHUNK_SIZE: un fichier plus grand qu'un bloc est
+        envoyé en upload multipart, sans jamais être chargé entièrement.
+
         Args:
             file_path: Chemin local du fichier
             object_name: Nom de l'objet dans MinIO (avec chemin)
@@ -74,29 +103,72 @@ class MinIOStorage:
             URL de l'objet uploadé, ou None si erreur
         """
         if not self._initialized:
-            print("⚠️ MinIO not initialized, skipping upload")
+            logger.debug("MinIO not initialized, skipping upload")
             return None
 
         try:
-            async with self.client as client:
-                async with aiofiles.open(file_path, "rb") as f:
-                    data = await f.read()
+            async with aiofiles.open(file_path, "rb") as f:
+                chunk = await f.read(self.CHUNK_SIZE)
 
-                    await client.put_object(
+                if len(chunk) < self.CHUNK_SIZE:
+                    # Petit fichier (lu en entier): un seul PUT
+                    await self.client.put_object(
                         Bucket=settings.MINIO_BUCKET,
                         Key=object_name,
-                        Body=data,
+                        Body=chunk,
                         ContentType=content_type,
                     )
+                else:
+                    await self._upload_multipart(f, object_name, content_type, chunk)
 
             # Construire l'URL de l'objet
             url = f"{'https' if settings.MINIO_SECURE else 'http'}://{settings.MINIO_ENDPOINT}/{settings.MINIO_BUCKET}/{object_name}"
             return url
 
         except Exception as e:
-            print(f"❌ Error uploading file to MinIO: {e}")
+            logger.error("Error uploading file to MinIO: {}", e)
             return None
 
+    async def _upload_multipart(self, f, object_name: str, content_type: str, chunk: bytes) -> None:
+        """Upload multipart du bloc déjà lu puis du reste du fichier `f`"""
+        upload = await self.client.create_multipart_upload(
+            Bucket=settings.MINIO_BUCKET,
+            Key=object_name,
+            ContentType=content_type,
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+
+        try:
+            part_number = 1
+            while chunk:
+                response = await self.client.upload_part(
+                    Bucket=settings.MINIO_BUCKET,
+                    Key=object_name,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=chunk,
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+                part_number += 1
+                chunk = await f.read(self.CHUNK_SIZE)
+
+            await self.client.complete_multipart_upload(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+
+        except BaseException:
+            # Ne pas laisser de parts orphelines côté serveur
+            await self.client.abort_multipart_upload(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+                UploadId=upload_id,
+            )
+            raise
+
     async def upload_bytes(
         self,
         data: bytes,
@@ -115,23 +187,22 @@ class MinIOStorage:
             URL de l'objet uploadé, ou None si erreur
         """
         if not self._initialized:
-            print("⚠️ MinIO not initialized, skipping upload")
+            logger.debug("MinIO not initialized, skipping upload")
             return None
 
         try:
-            async with self.client as client:
-                await client.put_object(
-                    Bucket=settings.MINIO_BUCKET,
-                    Key=object_name,
-                    Body=data,
-                    ContentType=content_type,
-                )
+            await self.client.put_object(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+                Body=data,
+                ContentType=content_type,
+            )
 
             url = f"{'https' if settings.MINIO_SECURE else 'http'}://{settings.MINIO_ENDPOINT}/{settings.MINIO_BUCKET}/{object_name}"
             return url
 
         except Exception as e:
-            print(f"❌ Error uploading bytes to MinIO: {e}")
+            logger.error("Error uploading bytes to MinIO: {}", e)
             return None
 
     async def download_file(
@@ -153,20 +224,19 @@ class MinIOStorage:
             return False
 
         try:
-            async with self.client as client:
-                response = await client.get_object(
-                    Bucket=settings.MINIO_BUCKET,
-                    Key=object_name,
-                )
+            response = await self.client.get_object(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+            )
 
-                async with aiofiles.open(file_path, "wb") as f:
-                    async for chunk in response["Body"]:
-                        await f.write(chunk)
+            async with response["Body"] as body, aiofiles.open(file_path, "wb") as f:
+                async for chunk in body.iter_chunks(self.CHUNK_SIZE):
+                    await f.write(chunk)
 
             return True
 
         except Exception as e:
-            print(f"❌ Error downloading file from MinIO: {e}")
+            logger.error("Error downloading file from MinIO: {}", e)
             return False
 
     async def download_bytes(self, object_name: str) -> Optional[bytes]:
@@ -183,17 +253,16 @@ class MinIOStorage:
             return None
 
         try:
-            async with self.client as client:
-                response = await client.get_object(
-                    Bucket=settings.MINIO_BUCKET,
-                    Key=object_name,
-                )
+            response = await self.client.get_object(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+            )
 
-                data = await response["Body"].read()
-                return data
+            async with response["Body"] as body:
+                return await body.read()
 
         except Exception as e:
-            print(f"❌ Error downloading bytes from MinIO: {e}")
+            logger.error("Error downloading bytes from MinIO: {}", e)
             return None
 
     async def delete_file(self, object_name: str) -> bool:
@@ -210,15 +279,14 @@ class MinIOStorage:
             return False
 
         try:
-            async with self.client as client:
-                await client.delete_object(
-                    Bucket=settings.MINIO_BUCKET,
-                    Key=object_name,
-                )
+            await self.client.delete_object(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+            )
             return True
 
         except Exception as e:
-            print(f"❌ Error deleting file from MinIO: {e}")
+            logger.error("Error deleting file from MinIO: {}", e)
             return False
 
     async def file_exists(self, object_name: str) -> bool:
@@ -235,17 +303,16 @@ class MinIOStorage:
             return False
 
         try:
-            async with self.client as client:
-                await client.head_object(
-                    Bucket=settings.MINIO_BUCKET,
-                    Key=object_name,
-                )
+            await self.client.head_object(
+                Bucket=settings.MINIO_BUCKET,
+                Key=object_name,
+            )
             return True
 
         except ClientError:
             return False
         except Exception as e:
-            print(f"❌ Error checking file existence in MinIO: {e}")
+            logger.error("Error checking file existence in MinIO: {}", e)
             return False
 
     async def get_presigned_url(
@@ -267,19 +334,19 @@ class MinIOStorage:
             return None
 
         try:
-            async with self.client as client:
-                url = await client.generate_presigned_url(
-                    "get_object",
-                    Params={
-                        "Bucket": settings.MINIO_BUCKET,
-                        "Key": object_name,
-                    },
-                    ExpiresIn=expires_in,
-                )
+            # Signature calculée localement: pas d'await, pas de contexte client
+            url = self._presign_client.generate_presigned_url(
+                "get_object",
+                Params={
+                    "Bucket": settings.MINIO_BUCKET,
+                    "Key": object_name,
+                },
+                ExpiresIn=expires_in,
+            )
             return url
 
         except Exception as e:
-            print(f"❌ Error generating presigned URL: {e}")
+            logger.error("Error generating presigned URL: {}", e)
             return None
 
 
@@ -1,30 +1,90 @@
 """
-Session SQLite async avec SQLAlchemy
-Compatible avec la base users.db existante
+Session async avec SQLAlchemy
+Compatible avec la base users.db existante (SQLite), ou PostgreSQL via asyncpg
 """
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from typing import AsyncGenerator
 
 from app.core.config import settings
 from app.models import Base
 
 
-# Créer l'engine async SQLite
-engine = create_async_engine(
-    settings.get_database_url(),
-    echo=settings.DEBUG,  # Log SQL queries en mode debug
-    future=True,
-)
+def _engine_options(database_url: str) -> dict:
+    """
+    Options de l'engine selon le driver
+
+    SQLite fichier utilise un pool de connexions dimensionné comme les
+    serveurs: en mode WAL, les lectures concurrentes s'exécutent en parallèle
+    sur des connexions distinctes (une base en mémoire garde le pool par
+    défaut, une connexion unique). Les serveurs (asyncpg, ...) ajoutent
+    pre-ping et recyclage.
+    """
+    url = make_url(database_url)
+    options = {
+        "echo": settings.SQLALCHEMY_ECHO,  # Log SQL queries
+        "future": True,
+    }
+
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return options
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            # timeout: attente du verrou d'écriture avant "database is locked"
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.SQLITE_BUSY_TIMEOUT,
+            },
+        )
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+    if settings.DB_PGBOUNCER and url.get_driver_name() == "asyncpg":
+        # pgbouncer (mode transaction) ne supporte pas les requêtes préparées nommées
+        options["connect_args"] = {
+            "prepared_statement_cache_size": 0,
+            "server_settings": {"jit": "off"},
+        }
 
+    return options
 
-# Activer les foreign keys pour SQLite
-@event.listens_for(engine.sync_engine, "connect")
-def set_sqlite_pragma(dbapi_conn, connection_record):
-    """Active les foreign keys pour SQLite"""
-    cursor = dbapi_conn.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
-    cursor.close()
+
+# Créer l'engine async (SQLite par défaut, asyncpg si DATABASE_URL est défini)
+DATABASE_URL = settings.get_database_url()
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+
+# Réglages SQLite appliqués à chaque connexion
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragma(dbapi_conn, connection_record):
+        """
+        Active les foreign keys et le mode WAL pour SQLite
+
+        WAL: les lectures ne sont plus bloquées par une écriture en cours;
+        synchronous=NORMAL: fsync au checkpoint plutôt qu'à chaque commit
+        (sûr en WAL, seules les dernières transactions peuvent être perdues
+        en cas de coupure de courant). mmap et cache de pages évitent les
+        appels read() sur les pages déjà chargées.
+        """
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 Mo
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 Mo
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
 
 # Session maker async
@@ -37,14 +97,23 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def _create_missing_indexes(sync_conn) -> None:
+    """Créer les index déclarés dans les modèles absents d'une base existante"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db() -> None:
     """
     Initialiser la base de données
-    Crée les tables si elles n'existent pas
+    Crée les tables et les index s'ils n'existent pas
     """
     async with engine.begin() as conn:
         # Créer toutes les tables définies dans Base
         await conn.run_sync(Base.metadata.create_all)
+        # create_all ignore les tables existantes: ajouter les index apparus depuis
+        await conn.run_sync(_create_missing_indexes)
         print("OK Database tables created/verified")
 
 
@@ -60,11 +129,16 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         users = result.scalars().all()
         return users
     ```
+
+    Les services valident eux-mêmes leurs écritures (`await db.commit()`);
+    le commit de sortie n'a lieu que si des modifications sont encore en
+    attente: les routes en lecture seule n'émettent aucun COMMIT.
     """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            if session.new or session.dirty or session.deleted:
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -4,9 +4,11 @@ Point d'entrée principal de l'API FastAPI
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import asyncio
+from loguru import logger
 
 from app.core.config import settings
 from app.core.logging_config import setup_logging
@@ -14,10 +16,12 @@ from app.api.routes import auth, cameras, events, stats, websocket, sessions
 
 # Configurer le logging dès le démarrage
 setup_logging()
-from app.db.session import init_db, close_db, get_db
+from app.db.session import init_db, close_db, AsyncSessionLocal
 from app.db.clickhouse import clickhouse_client
 from app.db.minio_storage import minio_storage
+from app.core.token_blacklist import token_blacklist
 from app.services.user_service import create_default_admin
+from app.services.camera_service import run_event_counter_flusher
 from app.core.init_cameras import init_cameras_from_config, autostart_enabled_cameras
 
 
@@ -30,39 +34,42 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting Sentinel IA Backend v2.0...")
 
-    # Initialiser la base de données SQLite
+    # Initialiser la base de données SQLite et connecter la blacklist des
+    # tokens (Redis si configuré): indépendants, lancés en parallèle
     print("Initializing databases...")
-    await init_db()
+    await asyncio.gather(init_db(), token_blacklist.connect())
 
-    # Créer l'utilisateur admin par défaut et charger les caméras
-    async for db in get_db():
-        await create_default_admin(db)
-        # Charger les caméras depuis cameras.yaml
-        await init_cameras_from_config(db)
-        break  # Une seule itération pour obtenir la session
+    # Créer l'utilisateur admin par défaut et charger les caméras depuis
+    # cameras.yaml en parallèle (une session chacun: une AsyncSession ne
+    # supporte pas les accès concurrents)
+    async def init_admin():
+        async with AsyncSessionLocal() as db:
+            await create_default_admin(db)
 
-    # Lancer l'autostart des caméras en arrière-plan (non-bloquant)
-    # Délai de 2 secondes pour laisser le serveur démarrer complètement
+    async def init_cameras():
+        async with AsyncSessionLocal() as db:
+            await init_cameras_from_config(db)
+
+    await asyncio.gather(init_admin(), init_cameras())
+
+    # Lancer l'autostart des caméras en arrière-plan (non-bloquant), sur la
+    # boucle de l'application: les callbacks de frames y sont planifiés
+    # Délai d'une seconde pour laisser le serveur démarrer complètement
     async def delayed_camera_autostart():
         await asyncio.sleep(1)
         print("Starting cameras asynchronously...")
 
-        async for db in get_db():
-            loop = asyncio.get_running_loop()
-            loop.run_in_executor(
-                None,
-                lambda: asyncio.run(autostart_enabled_cameras(db))
-            )
-            break
-
-    asyncio.create_task(delayed_camera_autostart())
+        async with AsyncSessionLocal() as db:
+            await autostart_enabled_cameras(db)
 
+    autostart_task = asyncio.create_task(delayed_camera_autostart())
 
-    # Connecter ClickHouse (events) - Désactivé temporairement
-    # await clickhouse_client.connect()
+    # Écriture par lot des compteurs d'événements des caméras
+    event_counter_task = asyncio.create_task(run_event_counter_flusher(AsyncSessionLocal))
 
-    # Connecter MinIO (media storage) - Désactivé temporairement
-    # await minio_storage.connect()
+    # Connecter ClickHouse (events) et MinIO (media storage) - Désactivés
+    # temporairement; indépendants, à lancer en parallèle une fois réactivés
+    # await asyncio.gather(clickhouse_client.connect(), minio_storage.connect())
 
     # TODO: Démarrage du processing orchestrator
     # TODO: Chargement des modèles YOLO
@@ -74,8 +81,24 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("Shutting down Sentinel IA Backend...")
 
+    # Autostart encore en cours: l'interrompre (et attendre la fermeture de
+    # sa session) avant de fermer la DB
+    autostart_task.cancel()
+    try:
+        await autostart_task
+    except asyncio.CancelledError:
+        pass
+
+    # Arrêter le flush périodique (les compteurs restants sont écrits)
+    event_counter_task.cancel()
+    try:
+        await event_counter_task
+    except asyncio.CancelledError:
+        pass
+
     # Fermer connexions DB
     await close_db()
+    await token_blacklist.close()
     # await clickhouse_client.disconnect()
     # await minio_storage.disconnect()
 
@@ -84,6 +107,9 @@ async def lifespan(app: FastAPI):
 
     print("Shutdown complete")
 
+    # Vider la file des handlers de log (enqueue=True)
+    await logger.complete()
+
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -94,6 +120,7 @@ app = FastAPI(
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # Sérialisation JSON en C (orjson)
 )
 
 # Configuration CORS
@@ -103,6 +130,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Monter les fichiers statiques
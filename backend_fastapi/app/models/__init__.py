@@ -14,8 +14,8 @@ class Base(AsyncAttrs, DeclarativeBase):
 
 
 # Import des modèles pour que Base les connaisse
-from app.models.user import User
+from app.models.user import User, Role
 from app.models.camera import Camera
 from app.models.session import Session
 
-__all__ = ["Base", "User", "Camera", "Session"]
+__all__ = ["Base", "User", "Role", "Camera", "Session"]
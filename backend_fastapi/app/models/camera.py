@@ -2,14 +2,30 @@
 Modèle Camera pour SQLAlchemy
 Stockage persistant des caméras avec credentials chiffrés
 """
-from sqlalchemy import String, Boolean, DateTime, Float, Text, JSON
+from sqlalchemy import String, Boolean, DateTime, Float, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
+from operator import attrgetter
 from typing import Optional, Dict, Any, List
 
 from app.models import Base
 
 
+# JSON sous SQLite, JSONB (binaire pré-parsé, opérateur @>) sous PostgreSQL
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
+
+# Champs exportés par Camera.to_dict: valeurs telles quelles / dates en ISO 8601
+_CAMERA_FIELDS = (
+    "id", "name", "url", "camera_type", "manufacturer", "model", "location",
+    "description", "enabled", "status", "fps", "resolution", "detection_zones",
+    "detection_classes", "confidence_threshold", "total_events",
+)
+_CAMERA_DATE_FIELDS = ("last_frame_time", "created_at", "updated_at", "last_seen")
+_get_camera_fields = attrgetter(*_CAMERA_FIELDS)
+_get_camera_dates = attrgetter(*_CAMERA_DATE_FIELDS)
+
+
 class Camera(Base):
     """
     Modèle caméra pour la surveillance
@@ -18,6 +34,15 @@ class Camera(Base):
     Les credentials sont chiffrés avant stockage
     """
     __tablename__ = "cameras"
+    __table_args__ = (
+        # PostgreSQL: `detection_classes @> '["person"]'` via l'index GIN
+        Index(
+            "idx_cameras_detection_classes_gin",
+            "detection_classes",
+            postgresql_using="gin",
+            postgresql_ops={"detection_classes": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     # Colonnes principales
     id: Mapped[str] = mapped_column(String(50), primary_key=True)
@@ -52,9 +77,9 @@ class Camera(Base):
     resolution: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # ex: "1920x1080"
     last_frame_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
-    # Configuration de détection (stocké en JSON)
-    detection_zones: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
-    detection_classes: Mapped[Optional[List[str]]] = mapped_column(JSON, nullable=True)
+    # Configuration de détection (stocké en JSON / JSONB)
+    detection_zones: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONVariant, nullable=True)
+    detection_classes: Mapped[Optional[List[str]]] = mapped_column(JSONVariant, nullable=True)
     confidence_threshold: Mapped[float] = mapped_column(Float, default=0.5, nullable=False)
 
     # Statistiques
@@ -72,25 +97,7 @@ class Camera(Base):
         """
         Convertir en dictionnaire (sans les credentials chiffrés)
         """
-        return {
-            "id": self.id,
-            "name": self.name,
-            "url": self.url,
-            "camera_type": self.camera_type,
-            "manufacturer": self.manufacturer,
-            "model": self.model,
-            "location": self.location,
-            "description": self.description,
-            "enabled": self.enabled,
-            "status": self.status,
-            "fps": self.fps,
-            "resolution": self.resolution,
-            "last_frame_time": self.last_frame_time.isoformat() if self.last_frame_time else None,
-            "detection_zones": self.detection_zones,
-            "detection_classes": self.detection_classes,
-            "confidence_threshold": self.confidence_threshold,
-            "total_events": self.total_events,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
-        }
+        data = dict(zip(_CAMERA_FIELDS, _get_camera_fields(self)))
+        for key, value in zip(_CAMERA_DATE_FIELDS, _get_camera_dates(self)):
+            data[key] = value.isoformat() if value else None
+        return data
@@ -1,13 +1,21 @@
 """
 Modèle de session utilisateur pour tracking des connexions actives
 """
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from operator import attrgetter
 from app.models import Base
 import uuid
 
 
+# Champs exportés par Session.to_dict: valeurs telles quelles / dates en ISO 8601
+_SESSION_FIELDS = ("id", "user_id", "token_jti", "user_agent", "ip_address", "is_active")
+_SESSION_DATE_FIELDS = ("created_at", "expires_at", "last_activity", "revoked_at")
+_get_session_fields = attrgetter(*_SESSION_FIELDS)
+_get_session_dates = attrgetter(*_SESSION_DATE_FIELDS)
+
+
 class Session(Base):
     """
     Session utilisateur active
@@ -15,9 +23,19 @@ class Session(Base):
     Permet de tracker toutes les connexions actives et de gérer la révocation
     """
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Sessions (actives) d'un utilisateur: sert aussi les filtres sur user_id seul
+        Index("ix_sessions_user_active", "user_id", "is_active"),
+        # PostgreSQL: index partiel limité aux sessions actives
+        Index(
+            "ix_sessions_active_partial",
+            "user_id",
+            postgresql_where=text("is_active"),
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
 
     # Informations sur le token
     token_jti = Column(String, unique=True, nullable=False, index=True)  # JWT ID (unique identifier)
@@ -30,7 +48,7 @@ class Session(Base):
 
     # Dates
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # purge des sessions expirées
     last_activity = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # État
@@ -41,16 +59,8 @@ class Session(Base):
     user = relationship("User", back_populates="sessions")
 
     def to_dict(self):
-        """Convertir en dictionnaire"""
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "token_jti": self.token_jti,
-            "user_agent": self.user_agent,
-            "ip_address": self.ip_address,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
-            "last_activity": self.last_activity.isoformat() if self.last_activity else None,
-            "is_active": self.is_active,
-            "revoked_at": self.revoked_at.isoformat() if self.revoked_at else None,
-        }
+        """Convertir en dictionnaire (colonnes uniquement, aucune relation)"""
+        data = dict(zip(_SESSION_FIELDS, _get_session_fields(self)))
+        for key, value in zip(_SESSION_DATE_FIELDS, _get_session_dates(self)):
+            data[key] = value.isoformat() if value else None
+        return data
@@ -2,14 +2,36 @@
 Modèle User pour SQLAlchemy
 Compatible avec la base SQLite existante (data/users.db)
 """
-from sqlalchemy import String, Boolean, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Boolean, DateTime, case
+from sqlalchemy.orm import Mapped, mapped_column, relationship, column_property
 from datetime import datetime
+from enum import IntEnum
 from typing import Optional
 
 from app.models import Base
 
 
+class Role(IntEnum):
+    """Niveaux des rôles (plus élevé = plus de droits)"""
+    VIEWER = 1
+    OPERATOR = 2
+    ADMIN = 3
+
+    @classmethod
+    def level_of(cls, role: Optional[str]) -> int:
+        """Niveau d'un rôle stocké en texte (0 si inconnu)"""
+        member = cls.__members__.get(role.upper()) if role else None
+        return member.value if member is not None else 0
+
+
+# Permissions par rôle (tuples partagés, rôle inconnu = viewer)
+_ROLE_PERMS: dict[str, tuple[str, ...]] = {
+    "admin": ("read", "write", "delete", "manage_users"),
+    "operator": ("read", "write"),
+    "viewer": ("read",),
+}
+
+
 class User(Base):
     """
     Modèle utilisateur pour l'authentification
@@ -28,13 +50,23 @@ class User(Base):
     role: Mapped[str] = mapped_column(String(20), default="viewer", nullable=False)
     # Roles possibles: admin, operator, viewer
 
+    # Niveau entier du rôle, calculé par la base dans le même SELECT
+    # (comparaison entière dans les contrôles d'accès, sans migration du schéma)
+    role_level: Mapped[int] = column_property(
+        case(
+            {role_.name.lower(): role_.value for role_ in Role},
+            value=role,
+            else_=0,
+        )
+    )
+
     # Statut
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, onupdate=datetime.utcnow, nullable=True)
-    last_login: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_login: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # Relations
     sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan")
@@ -43,16 +75,11 @@ class User(Base):
         return f"<User(id={self.id}, username={self.username}, role={self.role})>"
 
     @property
-    def permissions(self) -> list[str]:
+    def permissions(self) -> tuple[str, ...]:
         """
-        Retourne les permissions basées sur le rôle
+        Retourne les permissions basées sur le rôle (tuple partagé, non modifiable)
         """
-        if self.role == "admin":
-            return ["read", "write", "delete", "manage_users"]
-        elif self.role == "operator":
-            return ["read", "write"]
-        else:  # viewer
-            return ["read"]
+        return _ROLE_PERMS.get(self.role, _ROLE_PERMS["viewer"])
 
     def to_dict(self) -> dict:
         """
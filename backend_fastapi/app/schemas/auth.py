@@ -4,6 +4,8 @@ Schémas pour l'authentification
 from pydantic import BaseModel, Field
 from typing import Optional
 
+from app.schemas.user import UserResponse
+
 
 class Token(BaseModel):
     """Token JWT"""
@@ -42,7 +44,7 @@ class LoginResponse(BaseModel):
     access_token: str
     refresh_token: Optional[str] = None
     token_type: str = "bearer"
-    user: dict  # UserResponse
+    user: UserResponse
 
     model_config = {
         "json_schema_extra": {
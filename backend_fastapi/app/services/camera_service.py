@@ -3,20 +3,55 @@ Service pour la gestion des caméras
 CRUD operations sur les cameras avec chiffrement des credentials
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import Optional, List
+from sqlalchemy import bindparam, select, func, update
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, List
+from loguru import logger
+import asyncio
 import uuid
 from datetime import datetime
 
 from app.models.camera import Camera
 from app.schemas.camera import CameraCreate, CameraUpdate, CameraStatus
 from app.core.security import encrypt_credential, decrypt_credential
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache
+
+
+# Cache des réponses GET /cameras (liste et détail), invalidé à chaque écriture
+camera_cache = TTLCache(
+    max_size=256,
+    ttl_seconds=settings.CAMERA_DETAIL_CACHE_TTL_SECONDS,
+    stale_ttl_seconds=settings.CAMERA_CACHE_STALE_SECONDS,
+)
+
+
+def invalidate_camera_cache() -> None:
+    """Invalider les réponses caméras en cache (après création/modification/suppression)"""
+    camera_cache.clear()
+
+
+# Incréments de total_events en attente (camera_id -> delta), écrits par lot
+EVENT_COUNT_FLUSH_INTERVAL = 1.0
+_pending_event_counts: Dict[str, int] = defaultdict(int)
+_event_counts_lock = asyncio.Lock()
+
+# Un seul UPDATE exécuté en executemany (une ligne de paramètres par caméra)
+_increment_events_stmt = (
+    update(Camera.__table__)
+    .where(Camera.__table__.c.id == bindparam("camera_id"))
+    .values(total_events=Camera.__table__.c.total_events + bindparam("delta"))
+)
 
 
 async def get_camera_by_id(db: AsyncSession, camera_id: str) -> Optional[Camera]:
     """
     Récupérer une caméra par son ID
 
+    Passe par l'identity map de la session: aucune requête si la caméra
+    y est déjà chargée.
+
     Args:
         db: Session de base de données
         camera_id: ID de la caméra
@@ -24,8 +59,7 @@ async def get_camera_by_id(db: AsyncSession, camera_id: str) -> Optional[Camera]
     Returns:
         Camera ou None si non trouvée
     """
-    result = await db.execute(select(Camera).where(Camera.id == camera_id))
-    return result.scalar_one_or_none()
+    return await db.get(Camera, camera_id)
 
 
 async def get_camera_by_name(db: AsyncSession, name: str) -> Optional[Camera]:
@@ -72,6 +106,25 @@ async def get_cameras(
     return result.scalars().all()
 
 
+async def get_cameras_by_ids(db: AsyncSession, camera_ids: Iterable[str]) -> Dict[str, Camera]:
+    """
+    Récupérer plusieurs caméras en une seule requête
+
+    Args:
+        db: Session de base de données
+        camera_ids: IDs des caméras recherchées
+
+    Returns:
+        Dict camera_id -> Camera (les IDs inconnus sont absents)
+    """
+    camera_ids = list(camera_ids)
+    if not camera_ids:
+        return {}
+
+    result = await db.execute(select(Camera).where(Camera.id.in_(camera_ids)))
+    return {camera.id: camera for camera in result.scalars()}
+
+
 async def get_cameras_count(db: AsyncSession, enabled_only: bool = False) -> int:
     """
     Compter le nombre total de caméras
@@ -97,7 +150,9 @@ async def create_camera(
     camera_data: CameraCreate,
     username: Optional[str] = None,
     password: Optional[str] = None,
-    camera_type: str = "generic"
+    camera_type: str = "generic",
+    camera_id: Optional[str] = None,
+    commit: bool = True
 ) -> Camera:
     """
     Créer une nouvelle caméra
@@ -108,12 +163,16 @@ async def create_camera(
         username: Username pour connexion (optionnel, sera chiffré)
         password: Password pour connexion (optionnel, sera chiffré)
         camera_type: Type de caméra (imou, generic, etc.)
+        camera_id: ID imposé (ex: depuis cameras.yaml), généré sinon
+        commit: Valider la transaction (False pour regrouper plusieurs écritures;
+            l'appelant commit puis appelle invalidate_camera_cache)
 
     Returns:
         Caméra créée
     """
     # Générer un ID unique
-    camera_id = f"camera_{str(uuid.uuid4())[:8]}"
+    if camera_id is None:
+        camera_id = f"camera_{str(uuid.uuid4())[:8]}"
 
     # Chiffrer les credentials si fournis
     encrypted_username = encrypt_credential(username) if username else None
@@ -139,8 +198,10 @@ async def create_camera(
     )
 
     db.add(camera)
-    await db.commit()
-    await db.refresh(camera)
+    if commit:
+        await db.commit()
+        invalidate_camera_cache()
+        await db.refresh(camera)
 
     return camera
 
@@ -150,7 +211,8 @@ async def update_camera(
     camera_id: str,
     camera_data: CameraUpdate,
     username: Optional[str] = None,
-    password: Optional[str] = None
+    password: Optional[str] = None,
+    commit: bool = True
 ) -> Optional[Camera]:
     """
     Mettre à jour une caméra
@@ -161,6 +223,7 @@ async def update_camera(
         camera_data: Nouvelles données de la caméra
         username: Nouveau username (optionnel, sera chiffré)
         password: Nouveau password (optionnel, sera chiffré)
+        commit: Valider la transaction (voir create_camera)
 
     Returns:
         Caméra mise à jour ou None si non trouvée
@@ -184,19 +247,22 @@ async def update_camera(
 
     camera.updated_at = datetime.utcnow()
 
-    await db.commit()
-    await db.refresh(camera)
+    if commit:
+        await db.commit()
+        invalidate_camera_cache()
+        await db.refresh(camera)
 
     return camera
 
 
-async def delete_camera(db: AsyncSession, camera_id: str) -> bool:
+async def delete_camera(db: AsyncSession, camera_id: str, commit: bool = True) -> bool:
     """
     Supprimer une caméra
 
     Args:
         db: Session de base de données
         camera_id: ID de la caméra
+        commit: Valider la transaction (voir create_camera)
 
     Returns:
         True si supprimée, False si non trouvée
@@ -206,7 +272,9 @@ async def delete_camera(db: AsyncSession, camera_id: str) -> bool:
         return False
 
     await db.delete(camera)
-    await db.commit()
+    if commit:
+        await db.commit()
+        invalidate_camera_cache()
 
     return True
 
@@ -231,48 +299,118 @@ async def update_camera_status(
     Returns:
         Caméra mise à jour ou None si non trouvée
     """
-    camera = await get_camera_by_id(db, camera_id)
-    if not camera:
-        return None
-
-    camera.status = status
-    camera.last_seen = datetime.utcnow()
+    now = datetime.utcnow()
+    values = {"status": status, "last_seen": now}
 
     if fps is not None:
-        camera.fps = fps
+        values["fps"] = fps
 
     if resolution is not None:
-        camera.resolution = resolution
+        values["resolution"] = resolution
 
     if status == CameraStatus.ACTIVE:
-        camera.last_frame_time = datetime.utcnow()
+        values["last_frame_time"] = now
+
+    # UPDATE ... RETURNING: une seule requête, la ligne retournée est l'état final
+    result = await db.execute(
+        update(Camera)
+        .where(Camera.id == camera_id)
+        .values(**values)
+        .returning(Camera)
+        .execution_options(populate_existing=True)
+    )
+    camera = result.scalar_one_or_none()
+    if not camera:
+        return None
 
     await db.commit()
-    await db.refresh(camera)
+    invalidate_camera_cache()
 
     return camera
 
 
-async def increment_camera_events(db: AsyncSession, camera_id: str) -> Optional[Camera]:
+def increment_camera_events(camera_id: str, count: int = 1) -> None:
     """
     Incrémenter le compteur d'événements d'une caméra
 
+    Les incréments sont cumulés en mémoire et écrits par
+    flush_event_counters (total_events = total_events + delta, un UPDATE par
+    lot): une requête par intervalle au lieu d'un COMMIT par détection.
+
     Args:
-        db: Session de base de données
         camera_id: ID de la caméra
+        count: Nombre d'événements à ajouter
+    """
+    _pending_event_counts[camera_id] += count
+
+
+async def flush_event_counters(db: AsyncSession) -> int:
+    """
+    Écrire les compteurs d'événements cumulés (un UPDATE par lot)
+
+    Args:
+        db: Session de base de données
 
     Returns:
-        Caméra mise à jour ou None si non trouvée
+        Nombre de caméras mises à jour
     """
-    camera = await get_camera_by_id(db, camera_id)
-    if not camera:
-        return None
+    global _pending_event_counts
+
+    async with _event_counts_lock:
+        pending, _pending_event_counts = _pending_event_counts, defaultdict(int)
+        if not pending:
+            return 0
+
+        try:
+            await db.execute(
+                _increment_events_stmt,
+                [{"camera_id": camera_id, "delta": delta} for camera_id, delta in pending.items()]
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            # Réintégrer les incréments pour le prochain lot
+            for camera_id, delta in pending.items():
+                _pending_event_counts[camera_id] += delta
+            logger.error("Error flushing camera event counters: {}", e)
+            return 0
+
+    invalidate_camera_cache()
+    return len(pending)
+
+
+async def run_event_counter_flusher(session_factory) -> None:
+    """
+    Écrire les compteurs toutes les EVENT_COUNT_FLUSH_INTERVAL secondes
 
-    camera.total_events += 1
-    await db.commit()
-    await db.refresh(camera)
+    Tâche de fond lancée au démarrage; à l'annulation, les incréments
+    restants sont écrits une dernière fois.
 
-    return camera
+    Args:
+        session_factory: Fabrique de sessions (AsyncSessionLocal)
+    """
+    try:
+        while True:
+            await asyncio.sleep(EVENT_COUNT_FLUSH_INTERVAL)
+            if _pending_event_counts:
+                async with session_factory() as db:
+                    await flush_event_counters(db)
+    finally:
+        if _pending_event_counts:
+            async with session_factory() as db:
+                await flush_event_counters(db)
+
+
+@lru_cache(maxsize=512)
+def _decrypt_cached(encrypted_text: str) -> str:
+    """
+    Déchiffrement mémorisé par texte chiffré
+
+    Fernet tire un IV aléatoire à chaque chiffrement: un credential modifié
+    produit un nouveau texte chiffré, l'ancienne entrée n'est simplement
+    plus demandée (aucune invalidation nécessaire).
+    """
+    return decrypt_credential(encrypted_text)
 
 
 def get_camera_credentials(camera: Camera) -> tuple[Optional[str], Optional[str]]:
@@ -285,7 +423,7 @@ def get_camera_credentials(camera: Camera) -> tuple[Optional[str], Optional[str]
     Returns:
         Tuple (username, password) déchiffrés
     """
-    username = decrypt_credential(camera.encrypted_username) if camera.encrypted_username else None
-    password = decrypt_credential(camera.encrypted_password) if camera.encrypted_password else None
+    username = _decrypt_cached(camera.encrypted_username) if camera.encrypted_username else None
+    password = _decrypt_cached(camera.encrypted_password) if camera.encrypted_password else None
 
     return username, password
@@ -0,0 +1,205 @@
+"""
+Service pour la gestion des événements
+Les filtres et la pagination sont délégués à ClickHouse (WHERE / LIMIT / OFFSET)
+
+La pagination par curseur (keyset) sur (timestamp DESC, id DESC) est à
+privilégier : son coût ne dépend pas de la profondeur de page.
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+import random
+
+import numpy as np
+import orjson
+
+from app.db.clickhouse import clickhouse_client
+from app.schemas.event import EventFilters
+
+
+# Données mockées pour le développement (utilisées si ClickHouse n'est pas connecté)
+def generate_mock_events(count: int = 20, seed: int = 42) -> List[dict]:
+    """Génère des événements mockés pour le test (déterministes pour un seed donné)"""
+    rng = random.Random(seed)
+    event_types = ["person", "vehicle", "intrusion", "unknown"]
+    severities = ["low", "medium", "high", "critical"]
+    camera_ids = ["imou_01", "camera_1", "camera_2"]
+
+    events = []
+    base_time = datetime.utcnow()
+
+    for i in range(count):
+        event_type = rng.choice(event_types)
+        severity = rng.choice(severities)
+        camera_id = rng.choice(camera_ids)
+
+        # Timestamp décroissant (plus récent en premier)
+        timestamp = base_time - timedelta(minutes=i * 15)
+
+        events.append({
+            "id": f"event_{i+1}",
+            "camera_id": camera_id,
+            "event_type": event_type,
+            "severity": severity,
+            "description": f"Événement {event_type} détecté",
+            "timestamp": timestamp,
+            "acknowledged": i > 15,  # Les 5 premiers non acquittés
+            "acknowledged_by": "user_1" if i > 15 else None,
+            "acknowledged_at": timestamp + timedelta(minutes=5) if i > 15 else None,
+            "metadata": {
+                "confidence": round(rng.uniform(0.7, 0.99), 2),
+                "object_count": rng.randint(1, 3),
+            },
+        })
+
+    return events
+
+# Générés une seule fois à l'import, immuables (itérés sans copie)
+MOCK_EVENTS: Tuple[dict, ...] = tuple(generate_mock_events(20))
+
+# Curseur de pagination: (timestamp, id) du dernier événement de la page
+EventCursor = Tuple[datetime, str]
+
+
+def encode_cursor(event: Dict[str, Any]) -> str:
+    """
+    Construire le curseur de la page suivante à partir du dernier événement
+
+    Args:
+        event: Dernier événement de la page courante
+
+    Returns:
+        Curseur au format "<timestamp ISO>|<id>"
+    """
+    timestamp = event["timestamp"]
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    return f"{timestamp}|{event['id']}"
+
+
+def decode_cursor(cursor: str) -> EventCursor:
+    """
+    Décoder un curseur de pagination
+
+    Args:
+        cursor: Curseur au format "<timestamp ISO>|<id>"
+
+    Returns:
+        Tuple (timestamp, id)
+
+    Raises:
+        ValueError: Si le curseur est mal formé
+    """
+    timestamp, sep, event_id = cursor.partition("|")
+    if not sep or not event_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return datetime.fromisoformat(timestamp), event_id
+
+
+async def list_events(
+    filters: EventFilters,
+    limit: int = 50,
+    offset: int = 0,
+    before: Optional[EventCursor] = None
+) -> List[Dict[str, Any]]:
+    """
+    Récupérer les événements correspondant aux filtres
+
+    Args:
+        filters: Filtres (caméra, type, sévérité, dates, acquittement)
+        limit: Nombre maximum d'événements à retourner
+        offset: Nombre d'événements à sauter (ignoré si `before` est fourni)
+        before: Curseur (timestamp, id), retourne les événements strictement antérieurs
+
+    Returns:
+        Liste d'événements (dicts), plus récents en premier
+    """
+    if before is not None:
+        offset = 0
+
+    if not clickhouse_client.is_connected:
+        return _list_mock_events(filters, limit, offset, before)
+
+    rows = await clickhouse_client.get_events(
+        camera_id=filters.camera_id,
+        event_type=filters.event_type.value if filters.event_type else None,
+        severity=filters.severity.value if filters.severity else None,
+        start_date=filters.start_date,
+        end_date=filters.end_date,
+        acknowledged=filters.acknowledged,
+        before=before,
+        limit=limit,
+        offset=offset,
+    )
+    return [_row_to_event(row) for row in rows]
+
+
+def _row_to_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convertir une ligne ClickHouse au format EventResponse"""
+    event = dict(row)
+    metadata = event.get("metadata")
+    if isinstance(metadata, str):
+        event["metadata"] = orjson.loads(metadata) if metadata else None
+    event["acknowledged"] = bool(event.get("acknowledged"))
+    # ClickHouse stocke '' à la place de NULL pour ces colonnes
+    for field in ("acknowledged_by", "frame_url", "video_url"):
+        event[field] = event.get(field) or None
+    return event
+
+
+def _build_columns(events: Sequence[dict]) -> Dict[str, np.ndarray]:
+    """
+    Construire une vue colonnaire (un tableau NumPy par champ filtrable)
+
+    Permet de filtrer par masques booléens vectorisés au lieu d'évaluer
+    un prédicat Python par ligne.
+    """
+    return {
+        "id": np.array([e["id"] for e in events], dtype=str),
+        "camera_id": np.array([e["camera_id"] for e in events], dtype=str),
+        "event_type": np.array([e["event_type"] for e in events], dtype=str),
+        "severity": np.array([e["severity"] for e in events], dtype=str),
+        "acknowledged": np.array([e["acknowledged"] for e in events], dtype=bool),
+        "timestamp": np.array(
+            [e["timestamp"] for e in events],
+            dtype="datetime64[us]",
+        ),
+    }
+
+_MOCK_COLUMNS = _build_columns(MOCK_EVENTS)
+
+
+def _list_mock_events(
+    filters: EventFilters,
+    limit: int,
+    offset: int,
+    before: Optional[EventCursor] = None
+) -> List[Dict[str, Any]]:
+    """Filtrer les événements mockés par masques booléens sur les colonnes"""
+    columns = _MOCK_COLUMNS
+    mask = np.ones(len(MOCK_EVENTS), dtype=bool)
+
+    # Un masque par filtre fourni, combinés en place
+    if filters.camera_id:
+        mask &= columns["camera_id"] == filters.camera_id
+
+    if filters.event_type:
+        mask &= columns["event_type"] == filters.event_type.value
+
+    if filters.severity:
+        mask &= columns["severity"] == filters.severity.value
+
+    if filters.acknowledged is not None:
+        mask &= columns["acknowledged"] == filters.acknowledged
+
+    if before is not None:
+        before_ts, before_id = before
+        if before_ts.tzinfo is not None:
+            before_ts = before_ts.astimezone(timezone.utc).replace(tzinfo=None)
+        before_ts = np.datetime64(before_ts, "us")
+        # (timestamp, id) < (before_ts, before_id)
+        mask &= (columns["timestamp"] < before_ts) | (
+            (columns["timestamp"] == before_ts) & (columns["id"] < before_id)
+        )
+
+    indices = np.flatnonzero(mask)[offset:offset + limit]
+    return [MOCK_EVENTS[i] for i in indices]
@@ -2,9 +2,10 @@
 Service de gestion des sessions utilisateur
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func, case
+from sqlalchemy.orm import raiseload
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from loguru import logger
 
 from app.models.session import Session
@@ -19,7 +20,8 @@ async def create_session(
     refresh_token: Optional[str],
     expires_at: datetime,
     user_agent: Optional[str] = None,
-    ip_address: Optional[str] = None
+    ip_address: Optional[str] = None,
+    commit: bool = True
 ) -> Session:
     """
     Créer une nouvelle session utilisateur
@@ -33,6 +35,7 @@ async def create_session(
         expires_at: Date d'expiration du token
         user_agent: User-Agent du client
         ip_address: Adresse IP du client
+        commit: Valider la transaction (False pour la regrouper avec d'autres écritures)
 
     Returns:
         Session créée
@@ -53,8 +56,9 @@ async def create_session(
     )
 
     db.add(session)
-    await db.commit()
-    await db.refresh(session)
+    if commit:
+        await db.commit()
+        await db.refresh(session)
 
     logger.info(f"Session created for user {user_id} (JTI: {token_jti[:8]}...)")
     return session
@@ -94,9 +98,14 @@ async def get_user_sessions(
         active_only: Ne retourner que les sessions actives
 
     Returns:
-        Liste des sessions
+        Liste des sessions (relations non chargées: Session.to_dict n'utilise
+        que des colonnes, tout accès lazy lève une erreur au lieu d'une requête)
     """
-    query = select(Session).where(Session.user_id == user_id)
+    query = (
+        select(Session)
+        .options(raiseload("*"))
+        .where(Session.user_id == user_id)
+    )
 
     if active_only:
         query = query.where(Session.is_active == True)
@@ -105,6 +114,32 @@ async def get_user_sessions(
     return list(result.scalars().all())
 
 
+async def get_user_session_counts(
+    db: AsyncSession,
+    user_id: str
+) -> Tuple[int, int]:
+    """
+    Compter les sessions d'un utilisateur (une seule requête agrégée)
+
+    Args:
+        db: Session de base de données
+        user_id: ID de l'utilisateur
+
+    Returns:
+        Tuple (sessions actives, sessions totales)
+    """
+    result = await db.execute(
+        select(
+            func.count(case((Session.is_active == True, 1))),
+            func.count()
+        )
+        .select_from(Session)
+        .where(Session.user_id == user_id)
+    )
+    active, total = result.one()
+    return active, total
+
+
 async def revoke_session(
     db: AsyncSession,
     jti: str
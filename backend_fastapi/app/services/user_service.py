@@ -3,13 +3,16 @@ Service pour la gestion des utilisateurs
 CRUD operations sur les users
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import Optional, List
+from datetime import datetime, timezone
 import uuid
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async, password_needs_rehash
 
 
 async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
@@ -23,8 +26,14 @@ async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
     Returns:
         User ou None si non trouvé
     """
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none()
+    # Chemin critique (chaque requête authentifiée): une seule requête,
+    # tout accès à une relation non chargée lève une erreur au lieu d'un N+1
+    return await db.scalar(
+        select(User)
+        .options(raiseload("*"))
+        .where(User.id == user_id)
+        .limit(1)
+    )
 
 
 async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
@@ -38,8 +47,12 @@ async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User
     Returns:
         User ou None si non trouvé
     """
-    result = await db.execute(select(User).where(User.username == username))
-    return result.scalar_one_or_none()
+    return await db.scalar(
+        select(User)
+        .options(raiseload("*"))
+        .where(User.username == username)
+        .limit(1)
+    )
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
@@ -60,21 +73,29 @@ async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
 async def get_users(
     db: AsyncSession,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    with_sessions: bool = False
 ) -> List[User]:
     """
     Récupérer une liste d'utilisateurs avec pagination
 
+    Les sessions sont chargées en une requête pour toute la page
+    (selectinload) si demandées; toute autre relation lève une erreur au
+    lieu d'un chargement paresseux par utilisateur (N+1).
+
     Args:
         db: Session de base de données
         skip: Nombre d'utilisateurs à sauter
         limit: Nombre maximum d'utilisateurs à retourner
+        with_sessions: Charger aussi `User.sessions`
 
     Returns:
         Liste d'utilisateurs
     """
+    options = [selectinload(User.sessions)] if with_sessions else []
     result = await db.execute(
         select(User)
+        .options(*options, raiseload("*"))
         .offset(skip)
         .limit(limit)
         .order_by(User.created_at.desc())
@@ -97,7 +118,7 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
     user_id = str(uuid.uuid4())
 
     # Hasher le mot de passe
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
 
     # Créer l'utilisateur
     db_user = User(
@@ -142,7 +163,7 @@ async def update_user(
 
     # Hash le nouveau mot de passe si fourni
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
 
     # Appliquer les mises à jour
     for field, value in update_data.items():
@@ -165,7 +186,12 @@ async def delete_user(db: AsyncSession, user_id: str) -> bool:
     Returns:
         True si supprimé, False si non trouvé
     """
-    user = await get_user_by_id(db, user_id)
+    # Charger les sessions pour la suppression en cascade (delete-orphan)
+    user = await db.scalar(
+        select(User)
+        .options(selectinload(User.sessions))
+        .where(User.id == user_id)
+    )
     if not user:
         return False
 
@@ -197,16 +223,39 @@ async def authenticate_user(
         return None
 
     # Vérifier le mot de passe
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
 
     # Vérifier si l'utilisateur est actif
     if not user.is_active:
         return None
 
+    # Migrer le hash vers le coût configuré (validé avec le commit du login)
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+
     return user
 
 
+async def update_last_login(db: AsyncSession, user: User) -> None:
+    """
+    Mettre à jour la date de dernière connexion (sans commit)
+
+    Émet directement un UPDATE, sans passer par le suivi des modifications
+    de l'ORM, pour être validé dans la même transaction que la session.
+
+    Args:
+        db: Session de base de données
+        user: Utilisateur connecté
+    """
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(User).where(User.id == user.id).values(last_login=now)
+    )
+    # Refléter la valeur sur l'objet sans le marquer comme modifié
+    set_committed_value(user, "last_login", now)
+
+
 async def create_default_admin(db: AsyncSession) -> User:
     """
     Créer l'utilisateur admin par défaut si il n'existe pas
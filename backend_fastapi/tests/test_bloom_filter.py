@@ -0,0 +1,72 @@
+"""
+Tests du filtre de JTI révoqués (set -> Bloom, rotation des générations)
+"""
+import unittest
+from unittest import mock
+
+from app.core.bloom_filter import BloomTokenFilter, RotatingTokenFilter
+
+
+class BloomTokenFilterTest(unittest.TestCase):
+
+    def test_no_false_negative_after_conversion(self):
+        token_filter = BloomTokenFilter(capacity=1_000, error_rate=0.01, set_max_size=50)
+        jtis = [f"jti-{i}" for i in range(500)]
+
+        for jti in jtis[:50]:
+            token_filter.add(jti)
+        self.assertFalse(token_filter.is_bloom)
+
+        for jti in jtis[50:]:
+            token_filter.add(jti)
+        self.assertTrue(token_filter.is_bloom)
+        self.assertEqual(len(token_filter), len(jtis))
+
+        # Les éléments ajoutés avant la conversion sont recopiés dans le Bloom
+        for jti in jtis:
+            self.assertTrue(token_filter.might_contain(jti), jti)
+
+    def test_set_phase_is_exact(self):
+        token_filter = BloomTokenFilter(set_max_size=10)
+        token_filter.add("revoked")
+
+        self.assertTrue(token_filter.might_contain("revoked"))
+        self.assertFalse(token_filter.might_contain("valid"))
+
+
+class RotatingTokenFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_000.0
+        patcher = mock.patch(
+            "app.core.bloom_filter.time.monotonic",
+            side_effect=lambda: self.now,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token_filter = RotatingTokenFilter(period_seconds=60, set_max_size=10)
+
+    def test_entry_kept_for_at_least_one_period(self):
+        # Ajout juste avant une rotation: encore présent une période complète après
+        self.now += 59
+        self.token_filter.add("revoked")
+
+        self.now += 1
+        self.assertTrue(self.token_filter.might_contain("revoked"))
+
+        self.now += 59
+        self.assertTrue(self.token_filter.might_contain("revoked"))
+
+    def test_entry_dropped_after_two_rotations(self):
+        self.token_filter.add("revoked")
+
+        self.now += 60
+        self.assertTrue(self.token_filter.might_contain("revoked"))
+
+        self.now += 60
+        self.assertFalse(self.token_filter.might_contain("revoked"))
+        self.assertEqual(len(self.token_filter), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
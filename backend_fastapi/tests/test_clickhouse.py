@@ -0,0 +1,55 @@
+"""
+Tests du buffer d'insertion ClickHouse (sans serveur: client simulé)
+"""
+import unittest
+
+from app.db.clickhouse import ClickHouseClient
+
+
+class FailingClient:
+    """Client dont les INSERT échouent tant que `fail` est vrai"""
+
+    def __init__(self):
+        self.fail = True
+        self.inserted = []
+
+    def insert(self, table, data, column_names):
+        if self.fail:
+            raise ConnectionError("ClickHouse unavailable")
+        self.inserted.extend(data)
+
+
+class InsertBufferTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.clickhouse = ClickHouseClient()
+        self.clickhouse.client = FailingClient()
+        self.clickhouse._initialized = True
+
+    async def test_failed_insert_keeps_events_for_next_flush(self):
+        for i in range(3):
+            self.assertTrue(await self.clickhouse.insert_event({"id": str(i)}))
+
+        self.assertEqual(await self.clickhouse.flush(), 0)
+        self.assertEqual([row[0] for row in self.clickhouse._insert_buffer], ["0", "1", "2"])
+
+        # Nouvel événement arrivé pendant l'indisponibilité: écrit après le lot en échec
+        await self.clickhouse.insert_event({"id": "3"})
+        self.clickhouse.client.fail = False
+        self.assertEqual(await self.clickhouse.flush(), 4)
+        self.assertEqual([row[0] for row in self.clickhouse.client.inserted], ["0", "1", "2", "3"])
+        self.assertEqual(self.clickhouse._insert_buffer, [])
+
+    async def test_requeue_drops_oldest_events_over_cap(self):
+        self.clickhouse.INSERT_BATCH_SIZE = 2
+        self.clickhouse.INSERT_BUFFER_MAX = 3
+
+        for i in range(5):
+            await self.clickhouse.insert_event({"id": str(i)})
+            await self.clickhouse.flush()
+
+        self.assertEqual([row[0] for row in self.clickhouse._insert_buffer], ["2", "3", "4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests de la pagination par curseur (keyset) sur les événements mockés
+"""
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app.schemas.event import EventFilters
+from app.services import event_service
+
+
+def tied_events():
+    """Événements par groupes de 3 partageant le même timestamp, triés (timestamp DESC, id DESC)"""
+    base_time = datetime(2026, 1, 1, 12, 0, 0)
+    events = []
+    for group in range(4):
+        timestamp = base_time - timedelta(minutes=group)
+        for suffix in ("c", "b", "a"):
+            events.append({
+                "id": f"event_{group}_{suffix}",
+                "camera_id": "camera_1",
+                "event_type": "person",
+                "severity": "low",
+                "timestamp": timestamp,
+                "acknowledged": False,
+            })
+    return tuple(events)
+
+
+class KeysetPaginationTest(unittest.TestCase):
+
+    def setUp(self):
+        events = tied_events()
+        patcher = mock.patch.multiple(
+            event_service,
+            MOCK_EVENTS=events,
+            _MOCK_COLUMNS=event_service._build_columns(events),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.events = events
+
+    def paginate(self, limit):
+        pages = []
+        before = None
+        # Borne: un curseur qui ne progresse pas ferait boucler indéfiniment
+        for _ in range(len(self.events) + 1):
+            page = event_service._list_mock_events(EventFilters(), limit, 0, before)
+            if not page:
+                return pages
+            pages.append(page)
+            before = event_service.decode_cursor(event_service.encode_cursor(page[-1]))
+        self.fail("Pagination did not terminate")
+
+    def test_pages_with_timestamp_ties_have_no_gap_or_duplicate(self):
+        # Taille de page 2: les coupures tombent au milieu des groupes ex aequo
+        pages = self.paginate(limit=2)
+        ids = [event["id"] for page in pages for event in page]
+
+        self.assertEqual(ids, [event["id"] for event in self.events])
+        self.assertEqual(len(pages), 6)
+
+    def test_order_is_timestamp_then_id_descending(self):
+        ids = [
+            event["id"]
+            for page in self.paginate(limit=5)
+            for event in page
+        ]
+        expected = sorted(
+            self.events,
+            key=lambda event: (event["timestamp"], event["id"]),
+            reverse=True,
+        )
+        self.assertEqual(ids, [event["id"] for event in expected])
+
+    def test_malformed_cursor_rejected(self):
+        with self.assertRaises(ValueError):
+            event_service.decode_cursor("2026-01-01T12:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
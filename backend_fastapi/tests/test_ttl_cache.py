@@ -0,0 +1,58 @@
+"""
+Tests du cache TTL (expiration, période de grâce stale-if-error, LRU)
+"""
+import unittest
+from unittest import mock
+
+from app.core.ttl_cache import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_000.0
+        patcher = mock.patch(
+            "app.core.ttl_cache.time.monotonic",
+            side_effect=lambda: self.now,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = TTLCache(max_size=2, ttl_seconds=10, stale_ttl_seconds=30)
+
+    def test_get_returns_default_once_expired(self):
+        self.cache.set("camera", "online")
+        self.now += 9
+        self.assertEqual(self.cache.get("camera"), "online")
+
+        self.now += 1
+        self.assertIsNone(self.cache.get("camera"))
+
+    def test_get_stale_within_grace_window(self):
+        self.cache.set("camera", "online")
+        self.now += 25
+
+        # Expirée pour get, mais toujours servie en repli et conservée
+        self.assertIsNone(self.cache.get("camera"))
+        self.assertEqual(self.cache.get_stale("camera"), "online")
+        self.assertEqual(len(self.cache), 1)
+
+    def test_get_stale_after_grace_window(self):
+        self.cache.set("camera", "online")
+        self.now += 40
+
+        self.assertEqual(self.cache.get_stale("camera", "missing"), "missing")
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_entry_evicted(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("c"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()